@@ -0,0 +1,900 @@
+# pip install httpx
+# اجرا: python bench.py login_storm
+import asyncio
+import contextlib
+import importlib.util
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent
+
+# jwt.py هم‌نام پکیج pyjwt است؛ پوشه‌ی پروژه باید آخر sys.path باشد
+# تا `import jwt` داخل آن به pyjwt برسد و ماژول‌های کمکی هم پیدا شوند.
+if str(ROOT) in sys.path:
+    sys.path.remove(str(ROOT))
+sys.path.append(str(ROOT))
+
+
+def _load(name: str):
+    spec = importlib.util.spec_from_file_location(f"app_{name}", ROOT / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _report(label: str, samples: list[float]):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[int(len(samples) * 0.99) - 1] * 1000
+    print(f"{label:<32} n={len(samples):<6} p50={p50:8.2f}ms  p99={p99:8.2f}ms  mean={statistics.mean(samples) * 1000:8.2f}ms")
+
+
+# //////////////////// login storm ////////////////////////
+
+# p99 مسیر /users/me را یک بار بدون بار و یک بار در حالی که /token اشباع شده اندازه می‌گیرد
+def bench_login_storm(logins: int = 32, samples: int = 300):
+    jwt_app = _load("jwt")
+
+    async def sample(client, token):
+        result = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            await client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+            result.append(time.perf_counter() - start)
+            await asyncio.sleep(0.001)
+        return result
+
+    async def storm(client, stop):
+        while not stop.is_set():
+            await client.post("/token", data={"username": "johndoe", "password": "wrong"})
+
+    async def main():
+        transport = httpx.ASGITransport(app=jwt_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/token", data={"username": "johndoe", "password": "secret"})
+            token = response.json()["access_token"]
+            _report("/users/me idle", await sample(client, token))
+
+            stop = asyncio.Event()
+            workers = [asyncio.create_task(storm(client, stop)) for _ in range(logins)]
+            _report(f"/users/me with {logins} logins", await sample(client, token))
+            stop.set()
+            await asyncio.gather(*workers)
+            print((await client.get("/debug/hashing")).json())
+
+    asyncio.run(main())
+
+
+# //////////////////// token cache ////////////////////////
+
+def bench_token_cache(n: int = 20_000):
+    jwt_app = _load("jwt")
+    from token_cache import TokenCache
+
+    token = jwt_app.create_access_token({"sub": "johndoe"})
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(n):
+            await jwt_app.get_current_user(token)
+        return time.perf_counter() - start
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        jwt_app.token_cache = TokenCache(maxsize=0)
+        uncached = asyncio.run(run())
+        jwt_app.token_cache = TokenCache()
+        cached = asyncio.run(run())
+    print(f"uncached get_current_user: {uncached / n * 1e6:8.2f}us/call")
+    print(f"cached   get_current_user: {cached / n * 1e6:8.2f}us/call  {jwt_app.token_cache.stats()}")
+
+
+# //////////////////// cold import ////////////////////////
+
+_IMPORT_SNIPPET = """
+import importlib.util, sys, time
+sys.path.append({root!r})
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("app_jwt", {path!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(time.perf_counter() - start)
+"""
+
+
+# زمان import سرد jwt.py را در نسخه‌ی فعلی و نسخه‌ی اولیه‌ی مخزن (هش bcrypt هنگام import) مقایسه می‌کند
+def bench_cold_import(runs: int = 5):
+    import subprocess
+    import tempfile
+
+    base = subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.split()[0]
+    source = subprocess.run(["git", "show", f"{base}:jwt.py"], cwd=ROOT, capture_output=True, text=True).stdout
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = Path(tmp) / "jwt_before.py"
+        old_path.write_text(source, encoding="utf-8")
+        for label, path, root in (("before", old_path, tmp), ("after", ROOT / "jwt.py", str(ROOT))):
+            samples = []
+            for _ in range(runs):
+                out = subprocess.run(
+                    [sys.executable, "-c", _IMPORT_SNIPPET.format(root=root, path=str(path))],
+                    cwd=tmp, capture_output=True, text=True, check=True,
+                ).stdout
+                samples.append(float(out.split()[-1]))
+            print(f"cold import jwt.py {label:<7} min={min(samples) * 1000:8.1f}ms  median={statistics.median(samples) * 1000:8.1f}ms")
+
+
+# //////////////////// user repository ////////////////////////
+
+def _fake_user(i: int) -> dict:
+    return {
+        "username": f"user{i:07d}",
+        "email": f"user{i:07d}@example.com",
+        "full_name": f"User {i}",
+        "hashed_password": "$2b$12$" + f"{i:053d}",
+        "disabled": False,
+    }
+
+
+# حافظه‌ی هر کاربر باید با بزرگ شدن مخزن ثابت بماند
+def bench_user_repository(sizes=(10_000, 100_000, 1_000_000), lookups: int = 200_000):
+    import gc
+    import tracemalloc
+
+    from user_store import UserRepository
+
+    for size in sizes:
+        users = [_fake_user(i) for i in range(size)]
+        gc.collect()
+        tracemalloc.start()
+        repository = UserRepository(users)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # رشته‌ها بین dictهای ورودی و رکوردها مشترک‌اند؛ این عدد سربار رکورد و ایندکس‌هاست
+        print(f"{size:>9} users: {current / size:6.1f} bytes/user (records + indexes)")
+        del users
+
+    jwt_app = _load("jwt")
+    names = [f"user{i:07d}" for i in range(0, len(repository), max(1, len(repository) // lookups))][:lookups]
+    raw = {name: repository.get(name).to_dict() for name in names}
+
+    start = time.perf_counter()
+    for name in names:
+        jwt_app.UserInDB(**raw[name])
+    before = time.perf_counter() - start
+    start = time.perf_counter()
+    for name in names:
+        repository.get(name)
+    after = time.perf_counter() - start
+    print(f"dict + UserInDB(**user): {before / len(names) * 1e9:8.0f}ns/lookup")
+    print(f"UserRepository.get:      {after / len(names) * 1e9:8.0f}ns/lookup")
+
+
+# //////////////////// revocation ////////////////////////
+
+def bench_revocation(revoked: int = 100_000, checks: int = 200_000):
+    import uuid
+
+    from revocation import RevocationList
+
+    exp = time.time() + 3600
+    revocations = RevocationList(capacity=revoked)
+    for _ in range(revoked):
+        revocations.revoke(uuid.uuid4().hex, exp)
+    misses = [uuid.uuid4().hex for _ in range(checks)]
+    hits = list(revocations._revoked)[:checks]
+    for label, keys in (("not revoked", misses), ("revoked", hits)):
+        start = time.perf_counter()
+        for jti in keys:
+            revocations.is_revoked(jti)
+        elapsed = time.perf_counter() - start
+        print(f"is_revoked ({label:<11}) with {len(revocations)} revoked: {elapsed / len(keys) * 1e9:6.0f}ns/check")
+    print(f"bloom filter: {len(revocations._bloom.bits) / 1024:.0f} KiB, {revocations._bloom.hashes} hashes")
+
+
+# //////////////////// cursor pagination ////////////////////////
+
+# زمان هر صفحه باید در ابتدای داده و در عمق آن یکسان باشد
+def bench_cursor_pagination(n: int = 10_000_000, limit: int = 100, pages: int = 1000):
+    from pagination import SortedIndex, encode_cursor
+
+    start = time.perf_counter()
+    index = SortedIndex(key=lambda item: item, items=range(n))
+    print(f"built index of {n} items in {time.perf_counter() - start:.1f}s")
+
+    for depth in (0, n // 10, n // 2, n - limit * pages - 1):
+        cursor = encode_cursor(index._keys[depth - 1]) if depth else None
+        start = time.perf_counter()
+        for _ in range(pages):
+            _, cursor = index.page(cursor, limit)
+        elapsed = time.perf_counter() - start
+        print(f"{pages} pages from offset {depth:>9}: {elapsed / pages * 1e6:7.1f}us/page")
+
+
+# //////////////////// item store ////////////////////////
+
+def bench_item_store(n: int = 1_000_000, tags_per_item: int = 4, queries: int = 200):
+    import random
+    from datetime import datetime, timedelta
+
+    from item_store import ItemStore
+
+    rng = random.Random(0)
+    vocabulary = [f"tag{i}" for i in range(50)]
+    epoch = datetime(2024, 1, 1)
+    store = ItemStore()
+    start = time.perf_counter()
+    for i in range(n):
+        created = epoch + timedelta(seconds=rng.randrange(10**8))
+        store.upsert(i, {
+            "name": f"item{i}",
+            "created_at": created,
+            "updated_at": created + timedelta(seconds=rng.randrange(10**6)),
+            "tags": rng.sample(vocabulary, tags_per_item),
+        })
+    print(f"indexed {n} items in {time.perf_counter() - start:.1f}s")
+
+    for label, kwargs in (
+        ("no tags, offset 0", {}),
+        ("no tags, offset 500k", {"offset": n // 2}),
+        ("1 tag", {"tags": ["tag1"]}),
+        ("2 tags", {"tags": ["tag1", "tag2"]}),
+        ("3 tags", {"tags": ["tag1", "tag2", "tag3"]}),
+    ):
+        start = time.perf_counter()
+        for _ in range(queries):
+            store.query("updated_at", limit=100, **kwargs)
+        print(f"{label:<22} {(time.perf_counter() - start) / queries * 1000:8.3f}ms/query")
+
+    start = time.perf_counter()
+    for i in range(10_000):
+        item = dict(store.get(i), updated_at=epoch, tags=["tag9"])
+        store.upsert(i, item)
+    print(f"update: {(time.perf_counter() - start) / 10_000 * 1e6:.1f}us/item")
+
+
+# //////////////////// router dispatch ////////////////////////
+
+def bench_router_dispatch(resources: int = 400, requests: int = 3000):
+    from fastapi import FastAPI
+
+    from radix_router import install
+
+    def build():
+        app = FastAPI()
+        for i in range(resources):
+            app.get(f"/r{i}/items/")(lambda: None)
+            app.get(f"/r{i}/items/{{item_id}}")(lambda item_id: None)
+            app.put(f"/r{i}/items/{{item_id}}")(lambda item_id: None)
+        return app
+
+    async def call(app, path):
+        scope = {"type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"", "headers": []}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        await app(scope, receive, send)
+
+    async def run(app, path):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(app, path)
+        return (time.perf_counter() - start) / requests
+
+    for label, compiled in (("linear scan", False), ("radix tree", True)):
+        app = build()
+        if compiled:
+            install(app)
+        for path in ("/r0/items/1", f"/r{resources // 2}/items/1", f"/r{resources - 1}/items/1"):
+            print(f"{label:<12} {len(app.routes)} routes  GET {path:<16} {asyncio.run(run(app, path)) * 1e6:8.1f}us/request")
+
+
+# //////////////////// bulk ingest ////////////////////////
+
+# بدنه‌ی NDJSON به اندازه‌ی size_mb به صورت جریانی ساخته و فرستاده می‌شود (هیچ‌جا کامل در حافظه نیست)
+def bench_bulk_ingest(size_mb: int = 1024, chunk_size: int = 64 * 1024):
+    import resource
+
+    main_app = _load("main")
+    line = b'{"name": "Laptop", "description": "Powerful laptop", "price": 1500.0, "tax": 100.0}\n'
+    lines_per_chunk = chunk_size // len(line)
+    chunk = line * lines_per_chunk
+    chunks = size_mb * 1024 * 1024 // len(chunk)
+
+    async def body():
+        for _ in range(chunks):
+            yield chunk
+
+    async def main():
+        transport = httpx.ASGITransport(app=main_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.perf_counter()
+            response = await client.post("/items/bulk", content=body(), headers={"content-type": "application/x-ndjson"})
+            elapsed = time.perf_counter() - start
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result = response.json()
+        print(f"{chunks * len(chunk) / 2**20:.0f} MB, {result['accepted']} items in {elapsed:.1f}s: "
+              f"{result['accepted'] / elapsed:,.0f} items/s, {chunks * len(chunk) / 2**20 / elapsed:.1f} MB/s")
+        print(f"peak RSS grew by {(rss_after - rss_before) / 1024:.1f} MB")
+
+    asyncio.run(main())
+
+
+# //////////////////// serializers ////////////////////////
+
+# مسیرهای دارای response_model در part4.py یک بار با مسیر عمومی FastAPI و یک بار با
+# serializer از پیش ساخته‌شده اجرا می‌شوند: درخواست در ثانیه و بیشترین حافظه‌ی موقت هر درخواست
+def bench_serializers(requests: int = 3000, tags: int = 200):
+    import json
+    import tracemalloc
+
+    import serializers
+
+    item = {"name": "Foo", "description": "A very nice Item", "price": 35.4, "tax": 3.2, "tags": [f"tag{i}" for i in range(tags)]}
+    cases = [
+        ("PUT", "/items8/foo", item),
+        ("PATCH", "/items9/bar", {"price": 3.0}),
+        ("PUT", "/items5/foo", {"title": "Foo", "timestamp": "2024-01-01T00:00:00"}),
+    ]
+
+    async def call(app, method, path, body):
+        scope = {"type": "http", "method": method, "path": path, "root_path": "", "query_string": b"",
+                 "headers": [(b"content-type", b"application/json")]}
+        payload = json.dumps(body).encode()
+
+        async def receive():
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def send(message):
+            pass
+
+        await app(scope, receive, send)
+
+    async def run(app, method, path, body):
+        for _ in range(100):
+            await call(app, method, path, body)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(app, method, path, body)
+        rate = requests / (time.perf_counter() - start)
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await call(app, method, path, body)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        return rate, peak
+
+    apps = {}
+    for label, enabled in (("generic", False), ("precompiled", True)):
+        serializers.ENABLED = enabled
+        part4 = _load("part4")
+        apps[label] = part4.app
+    serializers.ENABLED = True
+    for method, path, body in cases:
+        for label, app in apps.items():
+            rate, peak = asyncio.run(run(app, method, path, body))
+            print(f"{label:<12} {method:<6} {path:<14} {rate:8,.0f} req/s  peak {peak / 1024:6.1f} KiB/request")
+
+
+# //////////////////// batch scheduling ////////////////////////
+
+# windows پنجره‌ی زمانی یک بار با یک درخواست PUT /items6/ و یک بار با حلقه روی /items6/{item_id}
+def bench_batch_schedule(windows: int = 50_000, scalar_requests: int = 2000):
+    import uuid
+    from datetime import datetime, timedelta
+
+    part2 = _load("part2")
+    base = datetime(2024, 1, 1)
+    ids = [str(uuid.uuid4()) for _ in range(windows)]
+    starts = [(base + timedelta(minutes=i)).isoformat() for i in range(windows)]
+    ends = [(base + timedelta(minutes=i, hours=6)).isoformat() for i in range(windows)]
+    process_after = [float(i % 3600) for i in range(windows)]
+    repeat_at = [f"{i % 24:02d}:30:00" for i in range(windows)]
+
+    async def main():
+        transport = httpx.ASGITransport(app=part2.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            start = time.perf_counter()
+            for i in range(scalar_requests):
+                await client.put(f"/items6/{ids[i]}", json={
+                    "start_datetime": starts[i], "end_datetime": ends[i],
+                    "process_after": process_after[i], "repeat_at": repeat_at[i],
+                })
+            scalar = (time.perf_counter() - start) / scalar_requests
+
+            start = time.perf_counter()
+            response = await client.put("/items6/", json={
+                "item_id": ids, "start_datetime": starts, "end_datetime": ends,
+                "process_after": process_after, "repeat_at": repeat_at,
+            })
+            batch = (time.perf_counter() - start) / windows
+            assert len(response.json()["duration"]) == windows
+        print(f"scalar /items6/{{item_id}} x{scalar_requests}: {scalar * 1e6:8.1f}us/window  {1 / scalar:10,.0f} windows/s")
+        print(f"batch  /items6/ ({windows} windows): {batch * 1e6:8.1f}us/window  {1 / batch:10,.0f} windows/s")
+
+    asyncio.run(main())
+
+
+# //////////////////// sessions ////////////////////////
+
+# حافظه‌ی هر نشست و زمان get در یک میلیون نشست همزمان؛ سپس بارگذاری تنبل از SQLite
+def bench_sessions(n: int = 1_000_000, lookups: int = 200_000, sqlite_sessions: int = 100_000):
+    import gc
+    import random
+    import tempfile
+    import tracemalloc
+
+    from sessions import SessionStore, SQLiteSessionBackend
+
+    gc.collect()
+    tracemalloc.start()
+    store = SessionStore(maxsize=n)
+    start = time.perf_counter()
+    for i in range(n):
+        session = store.create()
+        session["user"] = i
+        store.save(session)
+    created = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{len(store)} sessions: {current / n:6.1f} bytes/session, create+save {created / n * 1e6:6.2f}us/session")
+
+    ids = random.sample(list(store._sessions), lookups)
+    start = time.perf_counter()
+    for session_id in ids:
+        store.get(session_id)
+    print(f"get (hit, {len(store)} sessions):  {(time.perf_counter() - start) / lookups * 1e9:6.0f}ns/lookup")
+    del store, ids
+    gc.collect()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteSessionBackend(f"{tmp}/sessions.db")
+        store = SessionStore(backend=backend)
+        start = time.perf_counter()
+        for i in range(sqlite_sessions):
+            session = store.create()
+            session["user"] = i
+            store.save(session)
+        print(f"sqlite create+save ({sqlite_sessions}): {(time.perf_counter() - start) / sqlite_sessions * 1e6:6.1f}us/session")
+        ids = random.sample(list(store._sessions), min(lookups, sqlite_sessions))
+        start = time.perf_counter()
+        for session_id in ids:
+            store.save(store.get(session_id))  # بدون تغییر: نباید چیزی نوشته شود
+        print(f"sqlite get+save unchanged:       {(time.perf_counter() - start) / len(ids) * 1e6:6.1f}us/session  writes={store.writes}")
+        store = SessionStore(backend=backend)  # شروع سرد: همه‌چیز از SQLite
+        start = time.perf_counter()
+        for session_id in ids:
+            store.get(session_id)
+        print(f"sqlite cold get (no data):       {(time.perf_counter() - start) / len(ids) * 1e6:6.1f}us/session")
+        backend.close()
+
+
+# //////////////////// tracing ////////////////////////
+
+# یک مسیر با دو dependency بدون tracing و با نرخ نمونه‌برداری 0، 1 و 100 درصد
+def bench_tracing(requests: int = 5000):
+    from typing import Annotated
+
+    from fastapi import Depends, FastAPI
+
+    from tracing import InMemoryExporter, Tracer, TracedRoute, TracingMiddleware
+
+    def build(tracer):
+        app = FastAPI()
+        if tracer is not None:
+            app.router.route_class = TracedRoute
+            app.add_middleware(TracingMiddleware, tracer=tracer)
+
+        async def common(q: str | None = None):
+            return {"q": q}
+
+        async def user(params: Annotated[dict, Depends(common)]):
+            return {"name": "johndoe", **params}
+
+        @app.get("/items/{item_id}")
+        async def read_item(item_id: int, current: Annotated[dict, Depends(user)]):
+            return {"item_id": item_id, "user": current}
+
+        return app
+
+    async def call(app):
+        scope = {"type": "http", "method": "GET", "path": "/items/1", "root_path": "", "query_string": b"q=x",
+                 "headers": [(b"host", b"test")]}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        await app(scope, receive, send)
+
+    async def run(app):
+        for _ in range(200):
+            await call(app)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(app)
+        return (time.perf_counter() - start) / requests
+
+    baseline = asyncio.run(run(build(None)))
+    print(f"{'no tracing':<16} {baseline * 1e6:8.1f}us/request")
+    for rate in (0.0, 0.01, 1.0):
+        tracer = Tracer(sample_rate=rate, exporter=InMemoryExporter(maxlen=1000))
+        elapsed = asyncio.run(run(build(tracer)))
+        print(f"sample rate {rate:<4.0%} {elapsed * 1e6:8.1f}us/request  overhead {(elapsed / baseline - 1) * 100:+5.1f}%")
+
+
+# //////////////////// prebuilt openapi ////////////////////////
+
+_OPENAPI_SNIPPET = """
+import asyncio, importlib.util, sys, time
+sys.path.append({root!r})
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("app_{name}", {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter() - start
+scope = {{"type": "http", "method": "GET", "path": "/openapi.json", "root_path": "", "query_string": b"",
+          "headers": [(b"host", b"test"), (b"accept-encoding", b"gzip")]}}
+size = 0
+async def receive():
+    return {{"type": "http.request", "body": b"", "more_body": False}}
+async def send(message):
+    global size
+    size += len(message.get("body", b""))
+start = time.perf_counter()
+asyncio.run(module.app(scope, receive, send))
+print(imported, time.perf_counter() - start, size)
+"""
+
+
+# زمان شروع سرد و اولین درخواست /openapi.json: حالت پیش‌فرض، فایل ساخته‌شده هنگام build، و ساخت هنگام شروع
+def bench_openapi(modules=("main", "part2"), runs: int = 3):
+    import subprocess
+
+    import openapi_cache
+
+    for name in modules:
+        path = openapi_cache.schema_path(ROOT / f"{name}.py")
+        for label, env, prebuilt in (("default", "0", None), ("startup build", "1", False), ("prebuilt file", "1", True)):
+            samples = []
+            for _ in range(runs):
+                if prebuilt is False:
+                    path.unlink(missing_ok=True)
+                out = subprocess.run(
+                    [sys.executable, "-c", _OPENAPI_SNIPPET.format(root=str(ROOT), name=name, path=str(ROOT / f"{name}.py"))],
+                    cwd=ROOT, capture_output=True, text=True, check=True, env={**os.environ, "PREBUILT_OPENAPI": env},
+                ).stdout.split()
+                samples.append((float(out[0]), float(out[1]), int(out[2])))
+            imported = statistics.median(sample[0] for sample in samples)
+            first = statistics.median(sample[1] for sample in samples)
+            print(f"{name:<6} {label:<14} import={imported * 1000:7.1f}ms  first /openapi.json={first * 1000:7.2f}ms  "
+                  f"{samples[0][2]:>6} bytes")
+
+
+# //////////////////// streaming uploads ////////////////////////
+
+# بیشترین حافظه‌ی پایتون هنگام آپلود multipart باید با بزرگ شدن فایل ثابت بماند
+def bench_uploads(sizes_mb=(16, 128, 512), chunk_size: int = 64 * 1024):
+    import tempfile
+    import tracemalloc
+
+    from fastapi import FastAPI, Request
+
+    from uploads import BlobStore, receive_file
+
+    boundary = b"benchboundary"
+    chunk = os.urandom(chunk_size)
+
+    async def body(size):
+        yield b"--" + boundary + b'\r\nContent-Disposition: form-data; name="file"; filename="big.bin"\r\n\r\n'
+        for _ in range(size // chunk_size):
+            yield chunk
+        yield b"\r\n--" + boundary + b"--\r\n"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(tmp)
+        app = FastAPI()
+
+        @app.post("/fileupload/")
+        async def upload(request: Request):
+            return await receive_file(request, store)
+
+        async def main(size):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+                tracemalloc.start()
+                start = time.perf_counter()
+                response = await client.post("/fileupload/", content=body(size), headers={
+                    "content-type": f"multipart/form-data; boundary={boundary.decode()}"})
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            assert response.json()["size"] == size
+            print(f"{size / 2**20:6.0f} MB upload: {size / 2**20 / elapsed:7.1f} MB/s  peak python memory {peak / 2**20:6.2f} MB")
+
+        for size_mb in sizes_mb:
+            asyncio.run(main(size_mb * 2**20))
+
+
+# //////////////////// downloads ////////////////////////
+
+# چند خواننده‌ی همزمان یک فایل بزرگ (کامل و با Range) را از /files/{sha256} می‌گیرند
+def bench_downloads(size_mb: int = 256, readers=(1, 4, 16)):
+    import hashlib
+    import tempfile
+    import tracemalloc
+
+    from fastapi import FastAPI, Request
+
+    import uploads
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = uploads.BlobStore(tmp)
+        data = os.urandom(size_mb * 2**20)
+        sha256 = hashlib.sha256(data).hexdigest()
+        store.path_for(sha256).parent.mkdir(parents=True)
+        store.path_for(sha256).write_bytes(data)
+        del data
+        app = FastAPI()
+
+        @app.get("/files/{sha256}")
+        async def download(sha256: str, request: Request):
+            return uploads.BlobResponse(store.path_for(sha256), stat_result=store.stat(sha256))
+
+        async def fetch(headers):
+            received = 0
+            scope = {"type": "http", "method": "GET", "path": f"/files/{sha256}", "root_path": "", "query_string": b"",
+                     "headers": [(b"host", b"test"), *headers], "asgi": {"spec_version": "2.4"}}
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                nonlocal received
+                received += len(message.get("body", b""))
+
+            await app(scope, receive, send)
+            return received
+
+        async def run(count, headers):
+            start = time.perf_counter()
+            received = await asyncio.gather(*(fetch(headers) for _ in range(count)))
+            return sum(received) / 2**20 / (time.perf_counter() - start)
+
+        half = size_mb * 2**19
+        for label, headers in (("full", []), ("range", [(b"range", f"bytes={half}-".encode())])):
+            for count in readers:
+                tracemalloc.start()
+                rate = asyncio.run(run(count, headers))
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{label:<5} {count:>2} readers x {size_mb} MB: {rate:8.0f} MB/s  "
+                      f"peak python memory {peak / 2**20 / count:5.2f} MB/reader")
+
+
+# //////////////////// trusted returns ////////////////////////
+
+# مسیرهای response_model در part3.py (با همان مدل‌ها) یک بار با اعتبارسنجی خروجی و یک بار با @trusted_return؛
+# زمان handler + سریال‌سازی بدون سربار HTTP اندازه گرفته می‌شود
+def bench_trusted_returns(calls: int = 100_000):
+    from fastapi import FastAPI
+
+    from serializers import PrecompiledRoute
+
+    part3 = _load("part3")
+    user_in = part3.UserIn(username="johndoe", password="secret", email="john@example.com")
+    user_in_db = part3.UserInDB(username="johndoe", hashed_password="supersecretsecret",
+                                email="john@example.com", full_name="John Doe")
+    cases = [
+        ("POST /user/ UserIn -> UserOut", user_in, {"response_model": part3.UserOut}),
+        ("POST /user/ UserInDB -> UserOut1", user_in_db, {"response_model": part3.UserOut1}),
+        ("GET /items/{id} include={price}", part3.item_prices["foo"],
+         {"response_model": part3.Item, "response_model_include": {"price"}}),
+    ]
+
+    for label, value, options in cases:
+        timings = {}
+        for mode in ("validated", "trusted"):
+            async def endpoint():
+                return value
+
+            if mode == "trusted":
+                endpoint.__trusted_return__ = True
+            app = FastAPI()
+            app.router.route_class = PrecompiledRoute
+            app.get("/", **options)(endpoint)
+            call = app.routes[-1].dependant.call
+
+            async def run():
+                start = time.perf_counter()
+                for _ in range(calls):
+                    await call()
+                return (time.perf_counter() - start) / calls
+
+            timings[mode] = asyncio.run(run())
+        print(f"{label:<34} validated {timings['validated'] * 1e6:6.2f}us  trusted {timings['trusted'] * 1e6:6.2f}us  "
+              f"({timings['validated'] / timings['trusted']:.1f}x)")
+
+
+# //////////////////// streaming lists ////////////////////////
+
+# مسیر list[Item3] در part3.py یک بار با برگرداندن لیست کامل و یک بار با generator؛
+# حافظه‌ی اوج و زمان رسیدن اولین بایت (TTFB) برای لیست‌های بزرگ اندازه گرفته می‌شود
+def bench_streaming(sizes=(10_000, 100_000, 500_000)):
+    import tracemalloc
+
+    from fastapi import FastAPI
+
+    from serializers import PrecompiledRoute
+
+    part3 = _load("part3")
+
+    async def fetch(app, accept=b"application/json"):
+        first_byte = None
+        received = 0
+        scope = {"type": "http", "method": "GET", "path": "/items/", "root_path": "", "query_string": b"",
+                 "headers": [(b"host", b"test"), (b"accept", accept)], "asgi": {"spec_version": "2.4"}}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal first_byte, received
+            body = message.get("body", b"")
+            if body and first_byte is None:
+                first_byte = time.perf_counter()
+            received += len(body)
+
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        return first_byte - start, time.perf_counter() - start, received
+
+    for n in sizes:
+        for mode in ("list", "generator", "ndjson"):
+            app = FastAPI()
+            app.router.route_class = PrecompiledRoute
+            row = {"name": "Foo", "description": "There comes my hero"}
+
+            if mode == "list":
+                @app.get("/items/", response_model=list[part3.Item3])
+                async def read_items():
+                    return [dict(row, name=f"item-{i}") for i in range(n)]
+            else:
+                @app.get("/items/", response_model=list[part3.Item3])
+                async def read_items():
+                    return (dict(row, name=f"item-{i}") for i in range(n))
+
+            accept = b"application/x-ndjson" if mode == "ndjson" else b"application/json"
+            tracemalloc.start()
+            ttfb, total, received = asyncio.run(fetch(app, accept))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{n:>7} rows {mode:<9}: ttfb {ttfb * 1000:8.2f} ms  total {total * 1000:8.1f} ms  "
+                  f"{received / 2**20:6.1f} MB  peak python memory {peak / 2**20:7.2f} MB")
+
+
+# //////////////////// upload post-processing ////////////////////////
+
+# پردازش فایل‌های آپلودشده (checksum، gzip، metadata) یک بار روی خود event loop و یک بار با
+# ProcessingPool با تعداد پردازه‌های مختلف؛ توان عملیاتی و بیشترین توقف event loop اندازه گرفته می‌شود
+def bench_postprocess(files: int = 32, size_mb: int = 8, workers=(1, 2, 4, 8)):
+    import tempfile
+
+    import postprocess
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(files):
+            path = os.path.join(tmp, f"file-{i}")
+            with open(path, "wb") as f:
+                line = f"{i},item-{i},There comes my hero\n".encode()
+                f.write(line * (size_mb * 2**20 // len(line)))
+            paths.append(path)
+        total_mb = files * size_mb
+
+        def clear():
+            for path in paths:
+                if os.path.exists(path + ".gz"):
+                    os.unlink(path + ".gz")
+
+        async def run(process):
+            stalls = []
+
+            async def ticker():
+                while True:
+                    tick = time.perf_counter()
+                    await asyncio.sleep(0.005)
+                    stalls.append(time.perf_counter() - tick - 0.005)
+
+            task = asyncio.create_task(ticker())
+            await asyncio.sleep(0.01)
+            start = time.perf_counter()
+            await process()
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(0.01)  # تا ticker توقف آخر را هم ثبت کند
+            task.cancel()
+            return elapsed, max(stalls, default=0)
+
+        async def inline():
+            for path in paths:
+                postprocess.process_file(path)
+
+        clear()
+        elapsed, stall = asyncio.run(run(inline))
+        print(f"inline on event loop: {total_mb / elapsed:7.1f} MB/s  max loop stall {stall * 1000:8.1f} ms")
+
+        for count in workers:
+            pool = postprocess.ProcessingPool(max_workers=count)
+
+            async def pooled():
+                job = pool.create_job()
+                for path in paths:
+                    pool.submit(job, {}, path)
+                await pool.wait(job)
+
+            async def warm():
+                await pooled()
+                clear()
+
+            asyncio.run(warm())  # راه‌اندازی پردازه‌ها جزو زمان اندازه‌گیری نیست
+            elapsed, stall = asyncio.run(run(pooled))
+            clear()
+            pool.shutdown()
+            print(f"pool {count:>2} processes  : {total_mb / elapsed:7.1f} MB/s  max loop stall {stall * 1000:8.1f} ms  "
+                  f"({os.cpu_count()} cores)")
+
+
+# //////////////////// bulk user import ////////////////////////
+
+# وارد کردن کاربران از CSV با user_import.py و تعداد پردازه‌های مختلف، در مقایسه با هش کردن
+# یکی‌یکی رمزها (مثل POST /user/ پشت سر هم)؛ rounds کم تا اجرا کوتاه بماند
+def bench_user_import(users: int = 1000, rounds: int = 8, workers=(1, 2, 4, 8)):
+    import tempfile
+
+    from passlib.hash import bcrypt
+
+    from ingest import iter_csv
+    from user_import import UserImporter
+    from user_store import UserStore
+
+    rows = ["username,password,email,full_name"]
+    rows += [f"user{i},password{i},user{i}@example.com,User {i}" for i in range(users)]
+    data = ("\n".join(rows) + "\n").encode()
+
+    hasher = bcrypt.using(rounds=rounds)
+    start = time.perf_counter()
+    for i in range(200):
+        hasher.hash(f"password{i}")
+    print(f"one by one      : {200 / (time.perf_counter() - start):8.0f} users/s")
+
+    async def chunks():
+        for i in range(0, len(data), 64 * 1024):
+            yield data[i:i + 64 * 1024]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in workers:
+            path = os.path.join(tmp, f"users-{count}.json")
+            importer = UserImporter(UserStore(path), workers=count, rounds=rounds)
+            start = time.perf_counter()
+            summary = asyncio.run(importer.run(iter_csv(chunks())))
+            elapsed = time.perf_counter() - start
+            print(f"{count:>2} processes    : {summary['imported'] / elapsed:8.0f} users/s  "
+                  f"({summary['imported']} imported, {os.cpu_count()} cores)")
+
+
+if __name__ == "__main__":
+    benches = {name[len("bench_"):]: fn for name, fn in globals().items() if name.startswith("bench_")}
+    for name in sys.argv[1:] or benches:
+        print(f"# {name}")
+        benches[name]()
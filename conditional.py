@@ -0,0 +1,86 @@
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# شمارنده‌ی نسخه‌ها با هر بار اجرا از صفر شروع می‌شود؛ این پیشوند نمی‌گذارد ETag اجرای قبلی دوباره معتبر شود
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+# //////////////////// Resource Versions ////////////////////////
+
+# برای هر منبع (مثلاً "items6:<id>") یک شمارنده‌ی نسخه و زمان آخرین تغییر نگه داشته می‌شود
+class ResourceVersions:
+    def __init__(self):
+        self._versions: dict[str, tuple[int, datetime]] = {}
+
+    def touch(self, key: str) -> tuple[int, datetime]:
+        version = self._versions.get(key, (0, None))[0] + 1
+        # Last-Modified دقت ثانیه دارد؛ کسر ثانیه حذف می‌شود تا مقایسه با If-Modified-Since درست باشد
+        modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self._versions[key] = (version, modified)
+        return version, modified
+
+    def etag(self, key: str) -> str | None:
+        entry = self._versions.get(key)
+        if entry is None:
+            return None
+        digest = hashlib.blake2b(key.encode(), digest_size=6).hexdigest()
+        return f'"{_BOOT_ID}-{digest}-{entry[0]}"'
+
+    def last_modified(self, key: str) -> datetime | None:
+        entry = self._versions.get(key)
+        return entry[1] if entry else None
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+# //////////////////// Conditional Requests ////////////////////////
+
+# اگر If-None-Match آمده باشد فقط همان بررسی می‌شود و If-Modified-Since نادیده گرفته می‌شود (RFC 9110)
+def is_not_modified(etag: str | None, last_modified: datetime | None,
+                    if_none_match: str | None = None, if_modified_since: str | None = None) -> bool:
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # برای If-None-Match مقایسه‌ی weak انجام می‌شود، پس پیشوند W/ اهمیتی ندارد
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+# ETag نسخه‌ای (etag=...) قبل از سریال کردن بدنه بررسی می‌شود؛ در غیر این صورت بدنه یک بار
+# سریال و ETag از همان بایت‌ها ساخته می‌شود. در صورت تطابق، پاسخ 304 بدون بدنه ولی با همان
+# ETag/Last-Modified/Cache-Control برمی‌گردد.
+def conditional_response(content, *, if_none_match: str | None = None, if_modified_since: str | None = None,
+                         etag: str | None = None, last_modified: datetime | None = None,
+                         cache_control: str = "no-cache", headers: dict | None = None) -> Response:
+    response = None
+    if etag is None:
+        response = JSONResponse(jsonable_encoder(content), headers=headers)
+        etag = body_etag(response.body)
+    validators = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        validators["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+        return Response(status_code=304, headers={**(headers or {}), **validators})
+    if response is None:
+        response = JSONResponse(jsonable_encoder(content), headers=headers)
+    response.headers.update(validators)
+    return response
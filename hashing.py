@@ -0,0 +1,124 @@
+# pip install passlib[bcrypt]
+# انتخاب تعداد rounds مناسب این سخت‌افزار:
+#   python hashing.py calibrate 250
+import asyncio
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+
+# //////////////////// bcrypt cost ////////////////////////
+
+# هزینه‌ی bcrypt با هر round دو برابر می‌شود؛ پس یک بار با rounds کم اندازه می‌گیریم
+# و تعداد rounds لازم برای رسیدن به زمان هدف را تخمین می‌زنیم.
+def calibrate_rounds(target_ms: float = 250, probe_rounds: int = 8) -> int:
+    probe_hash = bcrypt.using(rounds=probe_rounds).hash("calibration")
+    elapsed = min(_time_verify(probe_hash) for _ in range(3))
+    rounds = probe_rounds + round(math.log2(target_ms / 1000 / elapsed))
+    return max(4, min(31, rounds))
+
+
+def _time_verify(hashed: str) -> float:
+    start = time.perf_counter()
+    bcrypt.verify("calibration", hashed)
+    return time.perf_counter() - start
+
+
+def _configured_rounds() -> int | None:
+    if os.environ.get("BCRYPT_ROUNDS"):
+        return int(os.environ["BCRYPT_ROUNDS"])
+    if os.environ.get("BCRYPT_TARGET_MS"):
+        return calibrate_rounds(float(os.environ["BCRYPT_TARGET_MS"]))
+    return None
+
+
+BCRYPT_ROUNDS = _configured_rounds()
+
+# هش‌هایی با rounds متفاوت از مقدار تنظیم‌شده needs_update=True می‌گیرند و هنگام ورود دوباره هش می‌شوند
+if BCRYPT_ROUNDS is None:
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+else:
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class HashingPoolBusy(Exception):
+    pass
+
+
+# //////////////////// Hashing Pool ////////////////////////
+
+# bcrypt عمداً کند است؛ اجرای آن روی event loop همه‌ی درخواست‌های دیگر را متوقف می‌کند.
+# این استخر کار هش را به چند thread محدود می‌سپارد (bcrypt در حین کار GIL را آزاد می‌کند)
+# و اگر صف بیش از حد پر شود، درخواست جدید را رد می‌کند.
+class HashingPool:
+    def __init__(self, max_workers: int | None = None, max_queue: int = 64):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.queued = 0  # منتظر thread آزاد
+        self.in_flight = 0  # در حال هش کردن
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.queued + self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HashingPoolBusy()
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        future = self._executor.submit(self._call, fn, args)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, fn, args):
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def _on_done(self, future):
+        # اگر درخواست قبل از شروع لغو شود، _call هرگز اجرا نمی‌شود
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+hashing_pool = HashingPool(
+    max_workers=int(os.environ.get("HASH_WORKERS", 0)) or None,
+    max_queue=int(os.environ.get("HASH_QUEUE", 64)),
+)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[1] != "calibrate":
+        sys.exit("usage: python hashing.py calibrate [TARGET_MS]")
+    target_ms = float(sys.argv[2]) if len(sys.argv) == 3 else 250
+    rounds = calibrate_rounds(target_ms)
+    verify_ms = _time_verify(bcrypt.using(rounds=rounds).hash("calibration")) * 1000
+    print(f"BCRYPT_ROUNDS={rounds}  # verify ~{verify_ms:.0f}ms (target {target_ms:.0f}ms)")
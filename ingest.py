@@ -0,0 +1,202 @@
+import codecs
+import csv
+import json
+
+from pydantic import TypeAdapter, ValidationError
+
+MAX_RECORD_BYTES = 1024 * 1024  # یک خط/عنصر بزرگ‌تر از این رد می‌شود تا حافظه محدود بماند
+
+
+class RecordError(Exception):
+    pass
+
+
+# //////////////////// Streaming Parsers ////////////////////////
+
+# بدنه تکه‌تکه خوانده می‌شود و هر خط NDJSON بلافاصله تحویل داده می‌شود؛ خروجی (شماره‌ی خط، مقدار یا خطا)
+async def iter_ndjson(chunks):
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, _loads(line)
+        if len(buffer) > MAX_RECORD_BYTES:
+            raise RecordError(f"line {line_no + 1} is longer than {MAX_RECORD_BYTES} bytes")
+    if buffer.strip():
+        yield line_no + 1, _loads(buffer)
+
+
+def _loads(raw):
+    try:
+        return json.loads(raw)
+    except ValueError as exc:
+        return RecordError(f"invalid JSON: {exc}")
+
+
+# آرایه‌ی JSON عنصر به عنصر خوانده می‌شود؛ «شماره‌ی خط» در اینجا شماره‌ی عنصر آرایه است
+async def iter_json_array(chunks):
+    parser = _ArrayParser()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        for item in parser.feed(text_decoder.decode(chunk)):
+            yield item
+    for item in parser.feed(text_decoder.decode(b"", final=True), final=True):
+        yield item
+    if parser.state != "done":
+        raise RecordError("incomplete JSON array")
+
+
+class _ArrayParser:
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.state = "start"  # start -> value_or_end -> comma_or_end -> value -> ... -> done
+        self.index = 0
+
+    def feed(self, text: str, final: bool = False) -> list:
+        buffer = self.buffer + text
+        position = 0
+        items = []
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position >= len(buffer):
+                break
+            char = buffer[position]
+            if self.state == "done":
+                raise RecordError("unexpected data after the JSON array")
+            if self.state == "start":
+                if char != "[":
+                    raise RecordError("body is not a JSON array")
+                self.state = "value_or_end"
+                position += 1
+            elif self.state == "comma_or_end" or (self.state == "value_or_end" and char == "]"):
+                if char == "]":
+                    self.state = "done"
+                elif char == ",":
+                    self.state = "value"
+                else:
+                    raise RecordError(f"expected ',' or ']' after element {self.index}")
+                position += 1
+            else:
+                try:
+                    value, end = self.decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    value, end = None, None
+                # عنصری که تا انتهای بافر ادامه دارد شاید هنوز کامل نرسیده باشد (مثلاً عدد 1|.5)
+                if end is None or (not final and (end == len(buffer) or (
+                        isinstance(value, (int, float)) and buffer[end] in "0123456789+-.eE"))):
+                    if final or len(buffer) - position > MAX_RECORD_BYTES:
+                        raise RecordError(f"element {self.index + 1} is not valid JSON")
+                    break
+                self.index += 1
+                self.state = "comma_or_end"
+                position = end
+                items.append((self.index, value))
+        self.buffer = buffer[position:]
+        return items
+
+
+# CSV با سطر اول به عنوان نام ستون‌ها؛ هر سطر یک dict است و خانه‌ی خالی یعنی فیلد نیامده.
+# سطری که داخل کوتیشن به خط بعد می‌رود تا بسته شدن کوتیشن جمع می‌شود؛ شماره‌ی خط، خط شروع سطر است.
+async def iter_csv(chunks):
+    parser = _CsvParser()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            item = parser.feed(line)
+            if item is not None:
+                yield item
+        if len(buffer) > MAX_RECORD_BYTES:
+            raise RecordError(f"line {parser.line_no + 1} is longer than {MAX_RECORD_BYTES} bytes")
+    buffer += text_decoder.decode(b"", final=True)
+    item = parser.feed(buffer) if buffer else None
+    if item is not None:
+        yield item
+    if parser.pending:
+        raise RecordError(f"unterminated quoted field starting on line {parser.start}")
+
+
+class _CsvParser:
+    def __init__(self):
+        self.header = None
+        self.line_no = 0
+        self.start = 0
+        self.pending = []
+        self.pending_bytes = 0
+        self.quotes = 0
+
+    def feed(self, line: str):
+        self.line_no += 1
+        if not self.pending:
+            self.start = self.line_no
+        self.pending.append(line.rstrip("\r"))
+        self.pending_bytes += len(line)
+        self.quotes += line.count('"')
+        if self.quotes % 2:
+            if self.pending_bytes > MAX_RECORD_BYTES:
+                raise RecordError(f"row starting on line {self.start} is longer than {MAX_RECORD_BYTES} bytes")
+            return None
+        text = "\n".join(self.pending)
+        self.pending, self.pending_bytes, self.quotes = [], 0, 0
+        if not text.strip():
+            return None
+        try:
+            row = next(csv.reader([text]))
+        except csv.Error as exc:
+            return self.start, RecordError(f"invalid CSV: {exc}")
+        if self.header is None:
+            self.header = [name.strip() for name in row]
+            return None
+        if len(row) != len(self.header):
+            return self.start, RecordError(f"expected {len(self.header)} columns, got {len(row)}")
+        return self.start, {name: value for name, value in zip(self.header, row) if value != ""}
+
+
+# //////////////////// Batch Validation ////////////////////////
+
+# رکوردها در دسته‌های با اندازه‌ی ثابت و با یک TypeAdapter(list[Model]) اعتبارسنجی می‌شوند.
+# خطای هر رکورد جدا گزارش می‌شود و بقیه‌ی دسته کنار گذاشته نمی‌شود.
+class BatchValidator:
+    def __init__(self, model, batch_size: int = 1000):
+        self.adapter = TypeAdapter(list[model])
+        self.batch_size = batch_size
+
+    async def batches(self, records):
+        async for _, values, errors in self.numbered_batches(records):
+            yield values, errors
+
+    # مثل batches، به همراه شماره‌ی خط هر رکورد معتبر (برای گزارش خطاهای بعد از اعتبارسنجی)
+    async def numbered_batches(self, records):
+        numbers, values, errors = [], [], []
+        async for number, value in records:
+            if isinstance(value, RecordError):
+                errors.append({"line": number, "errors": [str(value)]})
+                continue
+            numbers.append(number)
+            values.append(value)
+            if len(values) == self.batch_size:
+                yield self.validate(numbers, values, errors)
+                numbers, values, errors = [], [], []
+        if values or errors:
+            yield self.validate(numbers, values, errors)
+
+    def validate(self, numbers: list[int], values: list, errors: list[dict]):
+        try:
+            return numbers, self.adapter.validate_python(values), errors
+        except ValidationError as exc:
+            bad = {}
+            for error in exc.errors(include_url=False, include_input=False):
+                field = ".".join(str(part) for part in error["loc"][1:])
+                bad.setdefault(error["loc"][0], []).append(f"{field}: {error['msg']}" if field else error["msg"])
+            errors = errors + [{"line": numbers[i], "errors": messages} for i, messages in bad.items()]
+            good = [i for i in range(len(values)) if i not in bad]
+            return ([numbers[i] for i in good], self.adapter.validate_python([values[i] for i in good]),
+                    sorted(errors, key=lambda error: error["line"]))
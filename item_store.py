@@ -0,0 +1,132 @@
+import itertools
+from bisect import bisect_left, bisect_right, insort
+
+
+# //////////////////// Sorted List ////////////////////////
+
+# لیست مرتب تکه‌تکه: به جای یک لیست بزرگ، چند لیست کوچک مرتب نگه داشته می‌شود تا درج و حذف
+# فقط یک تکه‌ی کوچک را جابه‌جا کند (نه کل یک میلیون ورودی را).
+class _SortedList:
+    def __init__(self, load: int = 1000):
+        self._load = load
+        self._lists: list[list] = []
+        self._maxes: list = []  # بزرگ‌ترین مقدار هر تکه
+        self._offsets = None  # جمع تجمعی طول تکه‌ها؛ پس از هر تغییر دوباره ساخته می‌شود
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, value):
+        self._len += 1
+        self._offsets = None
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            return
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(value)
+            self._maxes[i] = value
+        else:
+            insort(self._lists[i], value)
+        bucket = self._lists[i]
+        if len(bucket) > 2 * self._load:
+            self._lists[i:i + 1] = [bucket[:self._load], bucket[self._load:]]
+            self._maxes[i:i + 1] = [bucket[self._load - 1], bucket[-1]]
+
+    def remove(self, value):
+        i = bisect_left(self._maxes, value)
+        bucket = self._lists[i]
+        del bucket[bisect_left(bucket, value)]
+        self._len -= 1
+        self._offsets = None
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._lists)
+
+    def slice(self, start: int, stop: int) -> list:
+        if self._offsets is None:
+            self._offsets = [0, *itertools.accumulate(len(bucket) for bucket in self._lists)]
+        result = []
+        i = bisect_right(self._offsets, start) - 1
+        position = start - self._offsets[i] if i >= 0 else 0
+        while i < len(self._lists) and len(result) < stop - start:
+            result.extend(self._lists[i][position:position + stop - start - len(result)])
+            i += 1
+            position = 0
+        return result
+
+
+# //////////////////// Item Store ////////////////////////
+
+# برای هر فیلد مرتب‌سازی یک لیست مرتب (مقدار، id) و برای برچسب‌ها یک ایندکس معکوس
+# (برچسب -> مجموعه‌ی idها) نگه داشته می‌شود. پرس‌وجو بدون برچسب فقط یک برش از لیست مرتب است.
+class ItemStore:
+    def __init__(self, sort_fields=("created_at", "updated_at")):
+        self.sort_fields = sort_fields
+        self._items: dict = {}
+        self._sorted: dict[str, _SortedList] = {field: _SortedList() for field in sort_fields}
+        self._tags: dict[str, set] = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, item_id):
+        return self._items.get(item_id)
+
+    # درج یا به‌روزرسانی: ورودی‌های قبلی آیتم از همه‌ی ایندکس‌ها برداشته و دوباره درج می‌شوند
+    def upsert(self, item_id, item: dict):
+        if item_id in self._items:
+            self._unindex(item_id, self._items[item_id])
+        self._items[item_id] = item
+        for field in self.sort_fields:
+            self._sorted[field].add((item[field], item_id))
+        for tag in set(item.get("tags", ())):
+            self._tags.setdefault(tag, set()).add(item_id)
+
+    def delete(self, item_id):
+        item = self._items.pop(item_id, None)
+        if item is not None:
+            self._unindex(item_id, item)
+
+    def _unindex(self, item_id, item: dict):
+        for field in self.sort_fields:
+            self._sorted[field].remove((item[field], item_id))
+        for tag in set(item.get("tags", ())):
+            ids = self._tags[tag]
+            ids.discard(item_id)
+            if not ids:
+                del self._tags[tag]
+
+    def query(self, order_by: str, offset: int = 0, limit: int = 100, tags=()) -> list[dict]:
+        entries = self._sorted[order_by]
+        if not tags:
+            return [self._items[item_id] for _, item_id in entries.slice(offset, offset + limit)]
+
+        # اشتراک لیست‌ها از کوچک‌ترین شروع می‌شود (set.intersection در C انجام می‌شود)
+        postings = sorted((self._tags.get(tag, set()) for tag in set(tags)), key=len)
+        matches = postings[0].intersection(*postings[1:]) if len(postings) > 1 else postings[0]
+        wanted = offset + limit
+        if offset >= len(matches):
+            return []
+
+        # اگر تعداد نتایج کم است مرتب کردن خودشان ارزان‌تر است، وگرنه روی لیست مرتب جلو می‌رویم
+        # تا wanted آیتم پیدا شود (به طور میانگین wanted * n / len(matches) قدم).
+        # مرتب کردن هر نتیجه حدود چهار برابر یک قدم پیمایش هزینه دارد.
+        if 4 * len(matches) <= wanted * len(self._items) / len(matches):
+            ordered = sorted((self._items[item_id][order_by], item_id) for item_id in matches)
+            return [self._items[item_id] for _, item_id in ordered[offset:wanted]]
+        result = []
+        for _, item_id in entries:
+            if item_id in matches:
+                result.append(item_id)
+                if len(result) == wanted:
+                    break
+        return [self._items[item_id] for item_id in result[offset:]]
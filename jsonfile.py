@@ -0,0 +1,44 @@
+# فایل‌های JSON مشترک بین چند پردازه (workerهای سرور و اسکریپت‌هایی مثل user_import.py).
+# نویسنده زیر قفل فایل، نسخه‌ی روی دیسک را دوباره می‌خواند، تغییرات خودش را روی آن اعمال می‌کند و
+# نتیجه را در فایل موقت یکتا می‌نویسد و جایگزین می‌کند؛ پس نه فایل نیمه‌کاره می‌ماند و نه تغییر
+# پردازه‌ی دیگری از بین می‌رود.
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # ویندوز: بدون قفل فایل
+    fcntl = None
+
+
+@contextmanager
+def locked(path):
+    path = Path(path)
+    with open(path.with_name(path.name + ".lock"), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def read_json(path, default=None):
+    path = Path(path)
+    if not path.exists():
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data, **dump_options):
+    path = Path(path)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent,
+                                     prefix=path.name + ".", delete=False) as f:
+        json.dump(data, f, **dump_options)
+    try:
+        os.chmod(f.name, 0o644)  # NamedTemporaryFile با 0600 می‌سازد
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
@@ -1,25 +1,37 @@
 # pip install pyjwt passlib[bcrypt]
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
+import os
+from pathlib import Path
+import uuid
 import jwt
-from fastapi import FastAPI, Depends, HTTPException, status
+from typing import Annotated
+from fastapi import Body, FastAPI, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from passlib.context import CryptContext
 from pydantic import BaseModel
+from hashing import HashingPoolBusy, hashing_pool, pwd_context
+from token_cache import TokenCache
+from user_store import UserRecord, UserStore
+from revocation import RevocationList
+from serializers import PrecompiledRoute
+import stages
+from stages import stage
+import openapi_cache
 
 # تولید کلید امنیتی: openssl rand -hex 32
 SECRET_KEY = "your-secret-key-here"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt روی event loop اجرا نمی‌شود؛ کار به استخر هش (hashing.py) سپرده می‌شود
+@stage("verify_password")
+async def verify_password(plain_password, hashed_password):
+    return await hashing_pool.run(pwd_context.verify, plain_password, hashed_password)
 
-def verify_password(plain_password, hashed_password):
-    print('1')
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    print('2')
-    return pwd_context.hash(password)
+@stage("get_password_hash")
+async def get_password_hash(password):
+    return await hashing_pool.run(pwd_context.hash, password)
 
 
 
@@ -39,43 +51,83 @@ class User(BaseModel):
 class UserInDB(User):
     hashed_password: str
 
-fake_users_db = {
-    "johndoe": {
-        "username": "johndoe",
-        "full_name": "John Doe",
-        "email": "johndoe@example.com",
-        "hashed_password": get_password_hash("secret"),
-        "disabled": False,
-    }
-}
+# کاربران با رمز هش‌شده از users.json و فقط در اولین درخواست بارگذاری می‌شوند (user_store.py)
+fake_users_db = UserStore(os.environ.get("USERS_FILE", Path(__file__).with_name("users.json")))
 
+# رکورد سبک کاربر برمی‌گردد؛ مدل User فقط در read_users_me ساخته می‌شود
+@stage("get_user")
 def get_user(db, username: str):
-    print('3')
-    if username in db:
-        user_dict = db[username]
-        return UserInDB(**user_dict)
+    return db.get(username)
 
-def authenticate_user(db, username: str, password: str):
-    print('4')
+@stage("authenticate_user")
+async def authenticate_user(db, username: str, password: str):
     user = get_user(db, username)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password(password, user.hashed_password):
         return False
+    # اگر هش با rounds قدیمی ساخته شده، با هزینه‌ی فعلی (hashing.BCRYPT_ROUNDS) دوباره هش می‌شود؛
+    # هش‌های جدید با هم در save دوره‌ای (پایین‌تر، lifespan) نوشته می‌شوند، نه یک بازنویسی فایل برای هر login
+    if pwd_context.needs_update(user.hashed_password):
+        db.update_hashed_password(username, await get_password_hash(password))
     return user
 
+@stage("create_access_token")
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
-    print('5')
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-app = FastAPI()
+token_cache = TokenCache(maxsize=10_000, ttl=300)
+
+# توکن‌های باطل‌شده هنگام شروع بارگذاری و هر REVOCATIONS_SAVE_INTERVAL ثانیه (و هنگام خاموش شدن) در فایل
+# مشترک workerها ادغام می‌شوند؛ پس crash فقط باطل‌شده‌های همین چند ثانیه‌ی آخر را از دست می‌دهد.
+# هش‌های دوباره‌ساخته‌ی کاربران هم هر USERS_SAVE_INTERVAL ثانیه یک‌جا در users.json نوشته می‌شوند
+# (اگر از دست بروند، کاربر در login بعدی دوباره هش می‌شود).
+revocations = RevocationList()
+REVOCATIONS_FILE = os.environ.get("REVOCATIONS_FILE", Path(__file__).with_name("revocations.json"))
+REVOCATIONS_SAVE_INTERVAL = float(os.environ.get("REVOCATIONS_SAVE_INTERVAL", 1))
+USERS_SAVE_INTERVAL = float(os.environ.get("USERS_SAVE_INTERVAL", 10))
+
+async def save_revocations():
+    revocations.merge(await asyncio.to_thread(revocations.snapshot, REVOCATIONS_FILE))
+
+async def save_users():
+    await asyncio.to_thread(fake_users_db.save)
+
+async def save_periodically(interval: float, store, save):
+    while True:
+        await asyncio.sleep(interval)
+        if store.dirty:
+            try:
+                await save()
+            except OSError as exc:
+                print(f"{save.__name__} failed: {exc}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(revocations.restore, REVOCATIONS_FILE)
+    savers = [
+        asyncio.create_task(save_periodically(REVOCATIONS_SAVE_INTERVAL, revocations, save_revocations)),
+        asyncio.create_task(save_periodically(USERS_SAVE_INTERVAL, fake_users_db, save_users)),
+    ]
+    yield
+    for saver in savers:
+        saver.cancel()
+    await save_revocations()
+    if fake_users_db.dirty:
+        await save_users()
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = PrecompiledRoute
 
 @app.post("/token", response_model=Token)
+@stage("login_for_access_token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    print('6')
-    user = authenticate_user(fake_users_db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(fake_users_db, form_data.username, form_data.password)
+    except HashingPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many login attempts", headers={"Retry-After": "1"})
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
     
@@ -85,20 +137,124 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+# همه‌ی پاسخ‌های 401 این وابستگی مثل OAuth2PasswordBearer سرآیند WWW-Authenticate دارند
+BEARER_CHALLENGE = {"WWW-Authenticate": "Bearer"}
+
+@stage("get_current_user")
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    print('7')
+    cached = token_cache.get(token)
+    if cached is not None:
+        user, jti = cached
+        if jti is not None and revocations.is_revoked(jti):
+            raise HTTPException(status_code=401, detail="Token revoked", headers=BEARER_CHALLENGE)
+        return user
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return get_user(fake_users_db, username)
+            raise HTTPException(status_code=401, detail="Invalid token", headers=BEARER_CHALLENGE)
+        jti = payload.get("jti")
+        if jti is not None and revocations.is_revoked(jti):
+            raise HTTPException(status_code=401, detail="Token revoked", headers=BEARER_CHALLENGE)
+        user = get_user(fake_users_db, username)
+        # توکن معتبر است ولی کاربرش دیگر وجود ندارد (حذف یا تغییر نام)
+        if user is None:
+            raise HTTPException(status_code=401, detail="Unknown user", headers=BEARER_CHALLENGE)
+        token_cache.put(token, username, (user, jti), exp=payload.get("exp"))
+        return user
     except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
+        raise HTTPException(status_code=401, detail="Token expired", headers=BEARER_CHALLENGE)
     except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        raise HTTPException(status_code=401, detail="Invalid token", headers=BEARER_CHALLENGE)
 
 @app.get("/users/me", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    print('8')
-    return current_user
+@stage("read_users_me")
+async def read_users_me(current_user: UserRecord = Depends(get_current_user)):
+    return current_user.to_model(User)
+
+
+# باطل کردن توکن فعلی پیش از رسیدن به exp (مثلاً هنگام خروج)
+@app.post("/token/revoke")
+async def revoke_token(token: str = Depends(oauth2_scheme)):
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("jti") is None:
+        raise HTTPException(status_code=400, detail="Token has no jti")
+    revocations.revoke(payload["jti"], payload["exp"])
+    token_cache.invalidate_token(token)
+    return {"message": "Token revoked"}
+
+
+# //////////////////// Token Introspection ////////////////////////
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: str | None = None
+    exp: int | None = None
+    disabled: bool | None = None
+    error: str | None = None
+
+MAX_INTROSPECT_TOKENS = 1000
+
+def _introspect(token: str, users: dict) -> TokenIntrospection:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        return TokenIntrospection(active=False, error="Token expired")
+    except jwt.InvalidTokenError:
+        return TokenIntrospection(active=False, error="Invalid token")
+    username = payload.get("sub")
+    if username is None:
+        return TokenIntrospection(active=False, error="Invalid token")
+    if payload.get("jti") is not None and revocations.is_revoked(payload["jti"]):
+        return TokenIntrospection(active=False, sub=username, exp=payload.get("exp"), error="Token revoked")
+    if username not in users:
+        users[username] = get_user(fake_users_db, username)
+    user = users[username]
+    if user is None:
+        return TokenIntrospection(active=False, sub=username, exp=payload.get("exp"), error="Unknown user")
+    return TokenIntrospection(active=not user.disabled, sub=username, exp=payload.get("exp"), disabled=bool(user.disabled))
+
+# gateway به جای یک درخواست برای هر توکن، یک دسته توکن را یک‌جا بررسی می‌کند.
+# توکن‌های تکراری فقط یک بار decode و هر کاربر فقط یک بار جستجو می‌شود.
+@app.post("/token/introspect", response_model=list[TokenIntrospection])
+async def introspect_tokens(tokens: Annotated[list[str], Body(max_length=MAX_INTROSPECT_TOKENS)]):
+    results = {}
+    users = {}
+    for token in tokens:
+        if token not in results:
+            results[token] = _introspect(token, users)
+    return [results[token] for token in tokens]
+
+
+# غیرفعال کردن کاربر؛ توکن‌های کش‌شده‌ی او هم باید باطل شوند
+def disable_user(username: str):
+    user = fake_users_db.get(username)
+    if user is not None:
+        user.disabled = True
+    token_cache.invalidate_user(username)
+
+
+@app.get("/debug/token-cache")
+async def token_cache_stats():
+    return token_cache.stats()
+
+
+# فقط وقتی زمان‌سنجی مراحل فعال است (AUTH_STAGE_TIMING=1) ثبت می‌شود
+if stages.ENABLED:
+    @app.get("/debug/stages")
+    async def stage_timings():
+        return stages.snapshot()
+
+
+@app.get("/debug/hashing")
+async def hashing_stats():
+    return hashing_pool.stats()
+
+
+# ////////////////////  Prebuilt OpenAPI ////////////////////////
+
+# با PREBUILT_OPENAPI=1 schema از پیش ساخته‌شده و gzip‌شده با ETag سرو می‌شود (openapi_cache.py)
+openapi_cache.install_from_env(app, __file__)
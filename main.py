@@ -1,10 +1,22 @@
-from fastapi import FastAPI, Query,Path,Body
+from fastapi import FastAPI, Query,Path,Body,HTTPException,Request
 from pydantic import BaseModel,Field
 from enum import Enum
 from typing import Annotated, Literal
+import itertools
+import os
+from pagination import InvalidCursor, SortedIndex
+from item_store import ItemStore
+from ingest import BatchValidator, RecordError, iter_json_array, iter_ndjson
+from datetime import datetime
+from response_cache import ResponseCache, ResponseCacheMiddleware, cached
+import openapi_cache
 
 app = FastAPI()
 
+# پاسخ مسیرهایی که @cached دارند به صورت بایت آماده نگه داشته می‌شود
+response_cache = ResponseCache()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache, router=app.router)
+
 @app.get("/")
 def read_root():
     return {"message": "Hello, FastAPI!"}
@@ -37,6 +49,7 @@ class ModelName(str, Enum):
 
 
 @app.get("/models/{model_name}")
+@cached(ttl=300)
 async def get_model(model_name: ModelName):
     if model_name is ModelName.alexnet:
         return {"model_name": model_name, "message": "Deep Learning FTW!"}
@@ -48,10 +61,16 @@ async def get_model(model_name: ModelName):
 # //////////////////// Query Parameters////////////////////////
 
 fake_items_db = [{"item_name": "Foo"}, {"item_name": "Bar"}, {"item_name": "Baz"}]
+items_by_name = SortedIndex(key=lambda item: item["item_name"], items=fake_items_db)
 
+# صفحه‌بندی با cursor به جای skip: صفحه‌ی بعد از مقدار next پاسخ قبلی شروع می‌شود
 @app.get("/itemsQuery/")
-async def read_items(skip: int = 0, limit: int = 10):
-    return fake_items_db[skip : skip + limit]
+async def read_items(cursor: str | None = None, limit: Annotated[int, Query(ge=1, le=100)] = 10):
+    try:
+        items, next_cursor = items_by_name.page(cursor, limit)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next": next_cursor}
 
 @app.get("/itemsQuery/{item_id}")
 async def read_item1(item_id: str, q: str | None = None):
@@ -60,6 +79,7 @@ async def read_item1(item_id: str, q: str | None = None):
     return {"item_id": item_id}
 
 @app.get("/itemsQuery1/{item_id}")
+@cached(ttl=60)
 async def read_item2(item_id: str, q: str | None = None, short: bool = False):
     item = {"item_id": item_id}
     if q:
@@ -145,9 +165,16 @@ class FilterParams(BaseModel):
     order_by: Literal["created_at", "updated_at"] = "created_at"  # مقدار ثابت از بین دو مقدار مشخص‌شده
     tags: list[str] = []  # لیستی از رشته‌ها
 
+# آیتم‌ها با ایندکس مرتب برای created_at/updated_at و ایندکس معکوس برای tags (item_store.py)
+catalog = ItemStore(sort_fields=("created_at", "updated_at"))
+catalog.upsert(1, {"name": "Foo", "created_at": datetime(2024, 1, 5), "updated_at": datetime(2024, 3, 1), "tags": ["new", "sale"]})
+catalog.upsert(2, {"name": "Bar", "created_at": datetime(2024, 2, 10), "updated_at": datetime(2024, 2, 11), "tags": ["sale"]})
+catalog.upsert(3, {"name": "Baz", "created_at": datetime(2024, 3, 20), "updated_at": datetime(2024, 4, 2), "tags": ["new"]})
+
 @app.get("/Pydantic/")
 async def read_items(filter_query: Annotated[FilterParams, Query()]):
-    return filter_query
+    items = catalog.query(filter_query.order_by, filter_query.offset, filter_query.limit, filter_query.tags)
+    return {"filter": filter_query, "items": items}
 
 
 
@@ -172,3 +199,58 @@ class User(BaseModel):
 
 
 # ////////////////////  ////////////////////////
+
+
+# //////////////////// Bulk Ingest ////////////////////////
+
+# بدنه به صورت NDJSON (هر خط یک Item) یا آرایه‌ی JSON به شکل جریانی خوانده و در دسته‌های
+# ۱۰۰۰تایی اعتبارسنجی می‌شود؛ حافظه به اندازه‌ی بدنه بستگی ندارد (ingest.py)
+item_batches = BatchValidator(Item, batch_size=1000)
+MAX_REPORTED_ERRORS = 1000
+
+# هر دسته با یک زمان ایجاد در catalog (همان که GET /Pydantic/ می‌خواند) درج می‌شود
+catalog_ids = itertools.count(len(catalog) + 1)
+
+def save_items_batch(items: list[Item]):
+    now = datetime.now()
+    for item in items:
+        catalog.upsert(next(catalog_ids), {**item.model_dump(), "created_at": now, "updated_at": now, "tags": []})
+
+@app.post("/items/bulk")
+async def bulk_create_items(request: Request):
+    if request.headers.get("content-type", "").startswith("application/json"):
+        records = iter_json_array(request.stream())
+    else:
+        records = iter_ndjson(request.stream())
+    accepted = rejected = 0
+    errors = []
+    try:
+        async for items, batch_errors in item_batches.batches(records):
+            save_items_batch(items)
+            accepted += len(items)
+            rejected += len(batch_errors)
+            errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+    except RecordError as exc:
+        raise HTTPException(status_code=400, detail={"error": str(exc), "accepted": accepted, "rejected": rejected, "errors": errors})
+    return {"accepted": accepted, "rejected": rejected, "errors": errors}
+
+
+@app.get("/debug/response-cache")
+async def response_cache_stats():
+    return response_cache.stats()
+
+
+# ////////////////////  Prebuilt OpenAPI ////////////////////////
+
+# با PREBUILT_OPENAPI=1 schema از پیش ساخته‌شده و gzip‌شده با ETag سرو می‌شود (openapi_cache.py)
+openapi_cache.install_from_env(app, __file__)
+
+
+# ////////////////////  Compiled Router ////////////////////////
+
+# با COMPILED_ROUTER=1 مسیرها یک بار در درخت radix ساخته می‌شوند (radix_router.py)
+# و مسیرهای تکراری یا سایه‌خورده هنگام شروع هشدار داده می‌شوند
+if os.environ.get("COMPILED_ROUTER") == "1":
+    from radix_router import install
+
+    install(app)
@@ -0,0 +1,140 @@
+# ساخت فایل‌های OpenAPI هنگام build (قبل از بالا آمدن workerها):
+#   python openapi_cache.py main part2 part3 part4 part5 jwt
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from fastapi import Request, Response
+from starlette.routing import Route
+
+from conditional import is_not_modified
+
+
+def schema_path(module_file) -> Path:
+    module_file = Path(module_file)
+    return module_file.with_name(f"openapi_{module_file.stem}.json.gz")
+
+
+# schema فقط از خود فایل app نمی‌آید: مدل‌ها و route classهای ماژول‌های کناری (serializers.py، item_store.py، ...)
+# و نسخه‌ی fastapi/pydantic هم در آن اثر دارند. پس همه‌ی ماژول‌های بارشده از پوشه‌ی app، به اضافه‌ی
+# __init__ این دو پکیج (که با هر نصب دوباره نوشته می‌شود)، منبع حساب می‌شوند. در انتهای ماژول app
+# صدا زده شود تا importهای آن بارگذاری شده باشند.
+def local_sources(module_file) -> list[Path]:
+    import fastapi
+    import pydantic
+
+    module_file = Path(module_file).resolve()
+    sources = {module_file, Path(fastapi.__file__), Path(pydantic.__file__)}
+    for module in list(sys.modules.values()):
+        file = getattr(module, "__file__", None)
+        if file and file.endswith(".py") and Path(file).resolve().parent == module_file.parent:
+            sources.add(Path(file).resolve())
+    return sorted(sources)
+
+
+# //////////////////// Build ////////////////////////
+
+def build(app, path) -> bytes:
+    body = json.dumps(app.openapi(), separators=(",", ":"), ensure_ascii=False).encode()
+    # mtime=0 تا خروجی برای یک schema همیشه یکسان باشد
+    compressed = gzip.compress(body, compresslevel=9, mtime=0)
+    # نام موقت یکتا: چند worker که هم‌زمان می‌سازند فایل موقت یکدیگر را بازنویسی یا جابه‌جا نمی‌کنند
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=Path(path).name + ".", delete=False) as tmp:
+        tmp.write(compressed)
+    try:
+        os.chmod(tmp.name, 0o644)  # NamedTemporaryFile با 0600 می‌سازد
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return compressed
+
+
+# فایل ساخته‌شده فقط وقتی استفاده می‌شود که از فایل‌های کد جدیدتر باشد؛ وگرنه دوباره ساخته می‌شود
+def load_or_build(app, path, sources=()) -> bytes:
+    path = Path(path)
+    if path.exists() and all(path.stat().st_mtime >= Path(source).stat().st_mtime for source in sources):
+        return path.read_bytes()
+    return build(app, path)
+
+
+# //////////////////// Serve ////////////////////////
+
+# مسیر /openapi.json پیش‌فرض FastAPI (که schema را در اولین درخواست هر worker می‌سازد) با مسیری
+# جایگزین می‌شود که بایت‌های gzip آماده را با ETag برمی‌گرداند. /docs همان openapi_url را می‌خواند.
+# نسخه‌ی gzip و نسخه‌ی ساده دو representation جدا هستند، پس هر کدام ETag خودش را دارد.
+def install(app, path, sources=()):
+    compressed = load_or_build(app, path, sources)
+    digest = hashlib.blake2b(compressed, digest_size=16).hexdigest()
+    plain = None  # برای کلاینت بدون gzip فقط یک بار باز می‌شود
+    plain_headers = {"ETag": f'"{digest}"', "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    gzip_headers = {**plain_headers, "ETag": f'"{digest}-gzip"'}
+
+    async def openapi(request: Request) -> Response:
+        nonlocal plain
+        use_gzip = accepts_gzip(request.headers.get("accept-encoding", ""))
+        headers = gzip_headers if use_gzip else plain_headers
+        if is_not_modified(headers["ETag"], None, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            return Response(compressed, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+        if plain is None:
+            plain = gzip.decompress(compressed)
+        return Response(plain, media_type="application/json", headers=headers)
+
+    routes = app.router.routes
+    for index, route in enumerate(routes):
+        if isinstance(route, Route) and route.path == app.openapi_url:
+            routes[index] = Route(app.openapi_url, openapi, include_in_schema=False)
+            break
+    else:
+        raise RuntimeError("app has no openapi route to replace")
+
+
+# بخش «Prebuilt OpenAPI» انتهای هر ماژول app: با PREBUILT_OPENAPI=1 فایل openapi_<module>.json.gz
+# (ساخته‌شده با `python openapi_cache.py` یا در اولین شروع) به جای ساختن schema در هر worker سرو می‌شود.
+# در انتهای ماژول صدا زده شود تا همه‌ی مسیرها و importها (local_sources) آماده باشند.
+def install_from_env(app, module_file):
+    if os.environ.get("PREBUILT_OPENAPI") == "1":
+        install(app, schema_path(module_file), sources=local_sources(module_file))
+
+
+# Accept-Encoding با q: "gzip;q=0" یعنی gzip نه؛ اگر gzip نام برده نشده باشد "*" تصمیم می‌گیرد
+def accepts_gzip(accept_encoding: str) -> bool:
+    wildcard = None
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name in ("gzip", "x-gzip"):
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
+
+
+if __name__ == "__main__":
+    import importlib.util
+
+    root = Path(__file__).resolve().parent
+    if str(root) in sys.path:
+        sys.path.remove(str(root))
+    sys.path.append(str(root))
+    for name in sys.argv[1:] or ["main", "part2", "part3", "part4", "part5", "jwt"]:
+        spec = importlib.util.spec_from_file_location(f"app_{name}", root / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        path = schema_path(root / f"{name}.py")
+        compressed = build(module.app, path)
+        print(f"{path.name}: {len(gzip.decompress(compressed))} bytes -> {len(compressed)} bytes gzipped")
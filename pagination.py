@@ -0,0 +1,61 @@
+import base64
+import binascii
+import itertools
+import json
+from bisect import bisect_right
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# //////////////////// Cursor ////////////////////////
+
+# cursor برای کلاینت یک رشته‌ی مبهم است؛ در واقع کلید مرتب‌سازی آخرین آیتم صفحه‌ی قبل است
+def encode_cursor(key: tuple) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[1], int):
+        raise InvalidCursor(cursor)
+    return tuple(key)
+
+
+# //////////////////// Sorted Index ////////////////////////
+
+# آیتم‌ها بر اساس (کلید مرتب‌سازی، شماره‌ی درج) مرتب نگه داشته می‌شوند؛ شماره‌ی درج
+# ترتیب را حتی برای کلیدهای تکراری پایدار می‌کند. پیدا کردن ابتدای صفحه با bisect، O(log n) است
+# و درج آیتم جدید صفحه‌هایی را که کلاینت قبلاً دیده جابه‌جا نمی‌کند.
+class SortedIndex:
+    def __init__(self, key, items=()):
+        self.key = key
+        self._seq = itertools.count()
+        entries = sorted(((key(item), next(self._seq)), item) for item in items)
+        self._keys = [entry[0] for entry in entries]
+        self._items = [entry[1] for entry in entries]
+
+    def insert(self, item):
+        entry_key = (self.key(item), next(self._seq))
+        position = bisect_right(self._keys, entry_key)
+        self._keys.insert(position, entry_key)
+        self._items.insert(position, item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def page(self, cursor: str | None, limit: int) -> tuple[list, str | None]:
+        start = 0
+        if cursor is not None:
+            try:
+                start = bisect_right(self._keys, decode_cursor(cursor))
+            except TypeError:  # کلید cursor با نوع کلیدهای این ایندکس نمی‌خواند
+                raise InvalidCursor(cursor)
+        end = start + limit
+        next_cursor = encode_cursor(self._keys[end - 1]) if end < len(self._keys) else None
+        return self._items[start:end], next_cursor
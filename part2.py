@@ -1,15 +1,31 @@
 
-from fastapi import FastAPI, Query,Path,Body,Cookie,Response,Header
+from fastapi import FastAPI, Query,Path,Body,Cookie,Response,Header,HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel,Field
 from enum import Enum
 from typing import Annotated, Literal
 from datetime import datetime, time, timedelta
 from typing import Annotated,Union
 from uuid import UUID
+from scheduling import compute_windows
+from conditional import ResourceVersions, conditional_response
+from sessions import SessionStore, SQLiteSessionBackend
+import os
+from tracing import FileExporter, Tracer, TracedRoute, TracingMiddleware
+import openapi_cache
 
 
 app = FastAPI()
 
+# traceparent/tracestate ورودی ادامه داده می‌شود؛ TRACE_SAMPLE_RATE درصد درخواست‌های بدون والد را نمونه‌برداری می‌کند
+# و spanها در TRACE_FILE (یا در حافظه، tracer.exporter.spans) نوشته می‌شوند
+tracer = Tracer(
+    sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", "0.01")),
+    exporter=FileExporter(os.environ["TRACE_FILE"]) if os.environ.get("TRACE_FILE") else None,
+)
+app.router.route_class = TracedRoute
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
     
 # //////////////////// set defult  ////////////////////////
 
@@ -146,6 +162,9 @@ async def update_item(
 
 # //////////////////Extra Data Types///////////////////////
 
+schedules: dict[UUID, dict] = {}  # آخرین زمان‌بندی هر آیتم؛ با GET /items6/{item_id} خوانده می‌شود
+versions = ResourceVersions()
+
 
 @app.put("/items6/{item_id}")
 async def read_items(
@@ -158,7 +177,7 @@ async def read_items(
     start_process = start_datetime + process_after  # محاسبه زمان شروع پردازش
     duration = end_datetime - start_process  # مدت زمان پردازش
 
-    return {
+    schedules[item_id] = {
         "item_id": item_id,
         "start_datetime": start_datetime,
         "end_datetime": end_datetime,
@@ -167,6 +186,30 @@ async def read_items(
         "start_process": start_process,
         "duration": duration,
     }
+    versions.touch(f"items6:{item_id}")  # نسخه و Last-Modified برای GET شرطی
+    return schedules[item_id]
+
+
+# نسخه‌ی دسته‌ای /items6/: هر فیلد یک ستون (لیست) است و خروجی هم ستونی برمی‌گردد.
+# process_after بر حسب ثانیه و repeat_at به شکل "HH:MM:SS" است.
+class ScheduleBatch(BaseModel):
+    item_id: list[UUID]
+    start_datetime: list[str]
+    end_datetime: list[str]
+    process_after: list[float]
+    repeat_at: list[str | None] | None = None
+
+
+@app.put("/items6/")
+async def schedule_items(batch: ScheduleBatch):
+    if len(batch.item_id) != len(batch.start_datetime):
+        raise HTTPException(status_code=422, detail="item_id and start_datetime must have the same length")
+    try:
+        windows = compute_windows(batch.start_datetime, batch.end_datetime, batch.process_after, batch.repeat_at)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    # ستون‌ها از قبل لیست‌های ساده‌اند؛ JSONResponse از jsonable_encoder عنصر به عنصر عبور نمی‌کند
+    return JSONResponse({"item_id": [str(item_id) for item_id in batch.item_id], **windows})
 
 
 # //////////////////Cookie///////////////////////
@@ -176,14 +219,34 @@ async def read_items(ads_id: Annotated[str | None, Cookie()] = None):
     return {"ads_id": ads_id}
 
 
+# نشست‌ها در حافظه (LRU با TTL لغزان) نگه داشته می‌شوند؛ با SESSION_DB در SQLite هم ذخیره می‌شوند
+sessions = SessionStore(
+    ttl=3600, backend=SQLiteSessionBackend(os.environ["SESSION_DB"]) if os.environ.get("SESSION_DB") else None
+)
+
+# مهلت نشست با هر دسترسی تمدید می‌شود، پس max_age کوکی هم هر بار دوباره فرستاده می‌شود؛
+# وگرنه مرورگر نشستی را که هنوز فعال است بعد از ttl ثانیه دور می‌انداخت
+def set_session_cookie(response: Response, session):
+    response.set_cookie(key="session_id", value=session.id, httponly=True, max_age=int(sessions.ttl))
+
 @app.get("/set-coocc/")
-async def set_cookie(response: Response):
-    response.set_cookie(key="session_id", value="ABC123XYZ", httponly=True, max_age=3600)
+async def set_cookie(response: Response, session_id: Annotated[str | None, Cookie()] = None):
+    session = sessions.get(session_id) if session_id else None
+    if session is None:
+        session = sessions.create()
+    session["visits"] = session.get("visits", 0) + 1
+    sessions.save(session)
+    set_session_cookie(response, session)
     return {"message": "Cookie has been set!"}
 
 @app.get("/getcooc/")
-async def get_user(session_id: Annotated[str | None, Cookie()] = None):
-    return {"session_id": session_id}
+async def get_user(response: Response, session_id: Annotated[str | None, Cookie()] = None):
+    session = sessions.get(session_id) if session_id else None
+    if session is None:
+        return {"session_id": None, "session": None}
+    sessions.save(session)  # فقط تمدید مهلت در backend، آن هم در صورت نیاز
+    set_session_cookie(response, session)
+    return {"session_id": session.id, "session": session.data}
 
 
 # 🎯 مدل کوکی با جلوگیری از دریافت مقادیر اضافه
@@ -217,6 +280,7 @@ class CommonHeaders(BaseModel):
     host: str
     save_data: bool = False  # مقدار پیش‌فرض به `False` تغییر یافت    
     if_modified_since: str | None = None
+    if_none_match: str | None = None
     traceparent: str | None = None
     x_tag: list[str] = []
 
@@ -224,12 +288,40 @@ class CommonHeaders(BaseModel):
 async def read_items(headers: Annotated[CommonHeaders, Header()]):
     return headers
 
+versions.touch("set-headers")
+
+# no-cache یعنی کلاینت باید اعتبارسنجی کند؛ با ETag/Last-Modified جواب معمولاً 304 بدون بدنه است
 @app.get("/set-headers/")
-async def set_headers(response: Response):
-    response.headers["X-Request-ID"] = "abc123"
-    response.headers["Cache-Control"] = "no-cache"
-    return {"message": "Headers have been set!"}
+async def set_headers(headers: Annotated[CommonHeaders, Header()]):
+    return conditional_response(
+        {"message": "Headers have been set!"},
+        if_none_match=headers.if_none_match,
+        if_modified_since=headers.if_modified_since,
+        last_modified=versions.last_modified("set-headers"),
+        headers={"X-Request-ID": "abc123"},
+    )
 
 @app.get("/get-headers/")
 async def get_headers(headers: Annotated[CommonHeaders, Header()]):
-    return headers
\ No newline at end of file
+    return headers
+
+
+# ETag از شمارنده‌ی نسخه ساخته می‌شود، پس برای 304 لازم نیست بدنه سریال و هش شود
+@app.get("/items6/{item_id}")
+async def read_schedule(item_id: UUID, headers: Annotated[CommonHeaders, Header()]):
+    if item_id not in schedules:
+        raise HTTPException(status_code=404, detail="Item not found")
+    key = f"items6:{item_id}"
+    return conditional_response(
+        schedules[item_id],
+        if_none_match=headers.if_none_match,
+        if_modified_since=headers.if_modified_since,
+        etag=versions.etag(key),
+        last_modified=versions.last_modified(key),
+    )
+
+
+# ////////////////////  Prebuilt OpenAPI ////////////////////////
+
+# با PREBUILT_OPENAPI=1 schema از پیش ساخته‌شده و gzip‌شده با ETag سرو می‌شود (openapi_cache.py)
+openapi_cache.install_from_env(app, __file__)
@@ -6,10 +6,30 @@ from typing import Annotated, Literal
 from datetime import datetime, time, timedelta
 from typing import Annotated,Union
 from uuid import UUID
+import asyncio
+import os
+import pathlib
+from contextlib import asynccontextmanager
+from python_multipart.exceptions import MultipartParseError
+from uploads import BlobResponse, BlobStore, UploadError, UploadTooLarge, receive_file, receive_files
+from postprocess import ProcessingPool, ProcessingPoolBusy
+from conditional import is_not_modified
 from fastapi.responses import JSONResponse
+from serializers import PrecompiledRoute, trusted_return
+from response_cache import ResponseCache, ResponseCacheMiddleware, cached
+import openapi_cache
 
 
-app = FastAPI()
+# پردازه‌های ProcessingPool (پایین‌تر، بخش multi-file upload) هنگام خاموش شدن بسته می‌شوند
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await asyncio.to_thread(processing.shutdown)
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = PrecompiledRoute
+response_cache = ResponseCache()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache, router=app.router)
 
 
 # //////////////////// response_model  ////////////////////////
@@ -24,6 +44,7 @@ class UserOut(BaseModel):
     email: str
 
 @app.post("/user/", response_model=UserOut)
+@trusted_return  # خروجی از قبل UserIn معتبر است؛ فقط username و email برداشته می‌شود
 async def create_user(user: UserIn):
     return user  # ✅ رمز عبور از پاسخ حذف می‌شود!
 
@@ -34,15 +55,17 @@ class Item(BaseModel):
     tax: float = 10.5
     tags: list[str] = []
 
-items = {
+# نام items پایین‌تر دوباره برای داده‌های دیگر استفاده می‌شود
+item_prices = {
     "foo": {"name": "Foo", "price": 50.2},
     "bar": {"name": "Bar", "description": "The bartenders", "price": 62, "tax": 20.2},
     "baz": {"name": "Baz", "description": None, "price": 50.2, "tax": 10.5, "tags": []},
 }
 
 @app.get("/items/{item_id}", response_model=Item,response_model_include={"price"},)
+@trusted_return
 async def read_item(item_id: str):
-    return items[item_id]
+    return item_prices[item_id]
 
 
 # //////////////////// Extra Models //////////////////// 
@@ -80,7 +103,9 @@ def fake_save_user(user_in: UserIn1):
     return user_in_db
 
 # مسیر ایجاد کاربر - خروجی نباید رمز عبور داشته باشد
-@app.post("/user/", response_model=UserOut1)
+# (مسیر جدا از /user/ بالا؛ با همان مسیر این نسخه‌ی EmailStr سایه می‌خورد و هرگز اجرا نمی‌شد)
+@app.post("/user1/", response_model=UserOut1)
+@trusted_return
 async def create_user(user_in: UserIn1):
     user_saved = fake_save_user(user_in)
     return user_saved
@@ -93,16 +118,17 @@ class Item3(BaseModel):
     description: str
 
 # لیست داده‌ها
-items = [
+items3 = [
     {"name": "Foo", "description": "There comes my hero"},
     {"name": "Red", "description": "It's my aeroplane"},
 ]
 
-# مسیر دریافت لیست آیتم‌ها
+# مسیر دریافت لیست آیتم‌ها - generator به صورت آرایه‌ی JSON (یا NDJSON) تکه‌تکه فرستاده می‌شود
 @app.get("/items/", response_model=list[Item3])
+@cached(ttl=60, vary=("accept",))
 async def read_items():
     print('ssssssssssssssssssssssss')
-    return items
+    return (item for item in items3)
 
 # //////////////////// Response Status Codes //////////////////// 
 
@@ -134,30 +160,62 @@ class FormData(BaseModel):
     username: str
     password: str
 
-@app.post("/login/")
+@app.post("/login1/")  # /login/ بالا همان مسیر را با Form جدا جدا دارد
 async def login(data: Annotated[FormData, Form()]):  # داده‌های فرم به مدل Pydantic منتقل می‌شوند
     return data
 
 # //////////////////// file //////////////////// 
 
 
-@app.post('/file/',status_code=status.HTTP_201_CREATED)
-async def file_add(file : Annotated[bytes,File()]):
+# فایل به صورت جریانی و بدون بافر کامل در UPLOAD_DIR (بر اساس SHA-256) ذخیره می‌شود و فقط مشخصاتش برمی‌گردد
+uploads = BlobStore(os.environ.get("UPLOAD_DIR", pathlib.Path(__file__).with_name("uploads")))
+
+# FastAPI بدنه را نمی‌خواند (پارامتر File ندارد)، پس schema فرم برای /docs دستی اعلام می‌شود
+UPLOAD_FORM = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}},
+}}}}}
+
+
+async def store_upload(request: Request, receive=receive_file, **options):
+    try:
+        return await receive(request, uploads, **options)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except (UploadError, MultipartParseError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@app.post('/file/',status_code=status.HTTP_201_CREATED, openapi_extra=UPLOAD_FORM)
+async def file_add(request: Request):
+    await store_upload(request)
     return('file add seccssusfully')
 
-@app.post('/fileupload/',status_code=status.HTTP_201_CREATED)
-async def file_upload(file : UploadFile):
-    print('sadasdasd')
-    x = await file.read()
-    y=await file.write(b"\nNew line added!")
+@app.post('/fileupload/',status_code=status.HTTP_201_CREATED, openapi_extra=UPLOAD_FORM)
+async def file_upload(request: Request):
+    upload = await store_upload(request)
     file_data = {
-        'file.filename':file.filename,
-        'file.content_type':file.content_type,
-        'await file.read(size)':x,
+        'file.filename':upload["filename"],
+        'file.content_type':upload["content_type"],
+        'sha256':upload["sha256"],
+        'size':upload["size"],
     }
-    await file.close()
     return (file_data)
 
+# فایل با SHA-256 خودش آدرس داده می‌شود، پس محتوا هرگز عوض نمی‌شود: ETag همان هش است و کش دائمی مجاز است
+@app.get("/files/{sha256}")
+async def download_file(
+    sha256: Annotated[str, Path(pattern="^[0-9a-f]{64}$")],
+    request: Request,
+    filename: str | None = None,
+):
+    stat_result = uploads.stat(sha256)
+    if stat_result is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    headers = {"ETag": f'"{sha256}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if is_not_modified(headers["ETag"], None, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return BlobResponse(uploads.path_for(sha256), filename=filename, stat_result=stat_result, headers=headers)
+
 # //////////////////// file form //////////////////// 
 
 @app.post("/upload/")
@@ -170,6 +228,52 @@ async def upload_file_with_form(
         "description": description
     }
 
+# نسخه‌ی چندفایلی: هر فایل به محض ذخیره شدن (در حالی که فایل‌های بعدی هنوز در راه‌اند) به استخر
+# پردازه‌ها برای checksum، فشرده‌سازی و metadata سپرده می‌شود. با wait=true پاسخ تا پایان پردازش
+# صبر می‌کند، وگرنه 202 با job_id برمی‌گردد و نتیجه‌ی هر فایل از /upload-files/{job_id} خوانده می‌شود.
+processing = ProcessingPool(
+    max_workers=int(os.environ.get("PROCESS_WORKERS", 0)) or None,
+    max_queue=int(os.environ.get("PROCESS_QUEUE", 1024)),
+)
+
+UPLOAD_FILES_FORM = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["files"], "properties": {
+        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+        "description": {"type": "string"},
+    },
+}}}}}
+
+
+@app.post("/upload-files/", status_code=status.HTTP_202_ACCEPTED, openapi_extra=UPLOAD_FILES_FORM)
+async def upload_files_with_form(request: Request, response: Response, wait: bool = False):
+    job = processing.create_job()
+    try:
+        _, fields = await store_upload(request, receive_files, on_file=lambda upload: processing.submit(
+            job, upload, uploads.path_for(upload["sha256"])))
+    except ProcessingPoolBusy:
+        processing.discard_job(job)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Processing queue is full",
+                            headers={"Retry-After": "1"})
+    except HTTPException:
+        processing.discard_job(job)
+        raise
+    job.description = fields.get("description")
+    if wait:
+        await processing.wait(job)
+        response.status_code = status.HTTP_200_OK
+    return job.to_dict()
+
+@app.get("/upload-files/{job_id}")
+async def upload_files_status(job_id: str):
+    job = processing.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/debug/processing")
+async def processing_stats():
+    return processing.stats()
+
 
 # //////////////////// file form //////////////////// 
 
@@ -189,7 +293,7 @@ class UnicornException(Exception):
     def __init__(self, name: str):
         self.name = name
 
-app = FastAPI()
+# همان app بالا؛ ساختن FastAPI() تازه در اینجا همه‌ی مسیرهای قبلی را از دسترس خارج می‌کرد
 
 @app.exception_handler(UnicornException)
 async def unicorn_exception_handler(request: Request, exc: UnicornException):
@@ -205,5 +309,7 @@ async def read_unicorn(name: str):
     return {"unicorn_name": name}
 
 
+# ////////////////////  Prebuilt OpenAPI ////////////////////////
 
-
+# با PREBUILT_OPENAPI=1 schema از پیش ساخته‌شده و gzip‌شده با ETag سرو می‌شود (openapi_cache.py)
+openapi_cache.install_from_env(app, __file__)
@@ -8,8 +8,14 @@ from typing import Annotated,Union
 from uuid import UUID
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
-import json
+from pagination import InvalidCursor, SortedIndex
+from serializers import PrecompiledRoute
+from response_cache import ResponseCache, ResponseCacheMiddleware, cached
+import openapi_cache
 app = FastAPI()
+app.router.route_class = PrecompiledRoute
+response_cache = ResponseCache()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache, router=app.router)
 
 # ////////////////////////////////Path Operation Configuration////////////////////////////////////
 
@@ -24,9 +30,10 @@ class Item(BaseModel):
 async def create_item(item: Item):
     return item
 
-@app.get("/items2/", tags=["items"])
+@app.get("/items2/", response_model=list[Item], tags=["items"])
+@cached(ttl=60, vary=("accept",))
 async def read_items():
-    return [{"name": "Foo", "price": 42}]
+    return (item for item in [{"name": "Foo", "price": 42}])
 
 @app.post(
     "/items3/",
@@ -56,6 +63,7 @@ async def create_item(item: Item):
     return item
 
 @app.get("/elements/", tags=["items"], deprecated=True)
+@cached(ttl=300)
 async def read_elements():
     return [{"item_id": "Foo"}]
 
@@ -71,14 +79,11 @@ class Item(BaseModel):
     timestamp: datetime
     description: str | None = None
 
-app = FastAPI()
-
 # مسیر برای به‌روزرسانی آیتم
 @app.put("/items5/{id}")
 def update_item(id: str, item: Item):
     # تبدیل مدل Pydantic به ساختار سازگار با JSON
     json_compatible_item_data = jsonable_encoder(item)
-    x =  json.dumps(json_compatible_item_data)
     # ذخیره‌سازی در پایگاه داده‌ی جعلی
     fake_db[id] = json_compatible_item_data
 
@@ -125,8 +130,8 @@ async def update_item(item_id: str, item: Item23):
 # //////////////////////Dependency Injection/////////////////////////
 
 # تابع وابستگی: پردازش پارامترهای عمومی
-async def common_parameters(q: str | None = None, skip: int = 0, limit: int = 100):
-    return {"q": q, "skip": skip, "limit": limit}
+async def common_parameters(q: str | None = None, cursor: str | None = None, limit: Annotated[int, Query(ge=1, le=100)] = 100):
+    return {"q": q, "cursor": cursor, "limit": limit}
 
 # استفاده از وابستگی در مسیرهای API
 @app.get("/items10/")
@@ -150,12 +155,13 @@ async def read_items(commons: CommonsDep):
 
 # دیتابیس جعلی
 fake_items_db = [{"item_name": "Foo"}, {"item_name": "Bar"}, {"item_name": "Baz"}]
+items_by_name = SortedIndex(key=lambda item: item["item_name"], items=fake_items_db)
 
 # تعریف کلاس برای مدیریت پارامترهای جستجو
 class CommonQueryParams:
-    def __init__(self, q: str | None = None, skip: int = 0, limit: int = 100):
+    def __init__(self, q: str | None = None, cursor: str | None = None, limit: Annotated[int, Query(ge=1, le=100)] = 100):
         self.q = q
-        self.skip = skip
+        self.cursor = cursor
         self.limit = limit
 
 # استفاده از کلاس به عنوان وابستگی
@@ -164,8 +170,11 @@ async def read_items(commons: Annotated[CommonQueryParams, Depends()]):
     response = {}
     if commons.q:
         response.update({"q": commons.q})
-    items = fake_items_db[commons.skip : commons.skip + commons.limit]
-    response.update({"items13": items})
+    try:
+        items, next_cursor = items_by_name.page(commons.cursor, commons.limit)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    response.update({"items13": items, "next": next_cursor})
     return response
 
 
@@ -296,3 +305,9 @@ async def get_item(item_id: str, username: str = Depends(get_username)):
 
 
 # /////////////////////////////////////////////////////////
+
+
+# ////////////////////  Prebuilt OpenAPI ////////////////////////
+
+# با PREBUILT_OPENAPI=1 schema از پیش ساخته‌شده و gzip‌شده با ETag سرو می‌شود (openapi_cache.py)
+openapi_cache.install_from_env(app, __file__)
@@ -2,6 +2,8 @@ from typing import Annotated
 from fastapi import Depends, FastAPI,HTTPException,status
 from fastapi.security import OAuth2PasswordBearer,OAuth2PasswordRequestForm
 from pydantic import BaseModel
+from user_store import UserRecord, UserRepository
+import openapi_cache
 
 app = FastAPI()
 
@@ -38,22 +40,23 @@ app = FastAPI()
 
 
 
-fake_users_db = {
-    "johndoe": {
+# مخزن کاربران مشترک با jwt.py (user_store.py)
+fake_users_db = UserRepository([
+    {
         "username": "johndoe",
         "full_name": "John Doe",
         "email": "johndoe@example.com",
         "hashed_password": "fakehashedsecret",
         "disabled": False,
     },
-    "alice": {
+    {
         "username": "alice",
         "full_name": "Alice Wonderson",
         "email": "alice@example.com",
         "hashed_password": "fakehashedsecret2",
         "disabled": True,
     },
-}
+])
 
 def fake_hash_password(password: str):
     return "fakehashed" + password
@@ -69,10 +72,8 @@ class UserInDB(User):
     hashed_password: str
 
 def get_user(db, username: str):
-    if username in db:
-        user_dict = db[username]
-        return UserInDB(**user_dict)
-    
+    return db.get(username)
+
 
 def fake_decode_token(token):
     user = get_user(fake_users_db, token)
@@ -90,18 +91,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         )
     return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: UserRecord = Depends(get_current_user)):
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 @app.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user_dict = fake_users_db.get(form_data.username)
-    if not user_dict:
+    user = get_user(fake_users_db, form_data.username)
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
-    user = UserInDB(**user_dict)
     hashed_password = fake_hash_password(form_data.password)
     
     if not hashed_password == user.hashed_password:
@@ -110,5 +110,11 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": user.username, "token_type": "bearer"}
 
 @app.get("/users/me")
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
-    return current_user
\ No newline at end of file
+async def read_users_me(current_user: UserRecord = Depends(get_current_active_user)):
+    return current_user.to_model(User)
+
+
+# ////////////////////  Prebuilt OpenAPI ////////////////////////
+
+# با PREBUILT_OPENAPI=1 schema از پیش ساخته‌شده و gzip‌شده با ETag سرو می‌شود (openapi_cache.py)
+openapi_cache.install_from_env(app, __file__)
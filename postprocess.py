@@ -0,0 +1,210 @@
+import asyncio
+import codecs
+import gzip
+import hashlib
+import multiprocessing
+import os
+import secrets
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+READ_CHUNK_BYTES = 1024 * 1024
+COMPRESS_LEVEL = 6
+
+# امضای چند بایت اول فایل برای تشخیص نوع واقعی محتوا (به content_type کلاینت اعتماد نمی‌شود)
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+)
+
+
+class ProcessingPoolBusy(Exception):
+    pass
+
+
+# //////////////////// Stages ////////////////////////
+
+# در پردازه‌ی جدا اجرا می‌شود: فایل فقط یک بار تکه‌تکه خوانده می‌شود و هر تکه به همه‌ی مراحل
+# (checksum، فشرده‌سازی gzip کنار فایل اصلی، و metadata) داده می‌شود، پس حافظه ثابت می‌ماند.
+def process_file(path: str) -> dict:
+    start = time.perf_counter()
+    md5 = hashlib.md5()
+    blake2b = hashlib.blake2b()
+    crc32 = 0
+    lines = 0
+    text = True
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    compressed_path = path + ".gz"
+    gz = None
+    if not os.path.exists(compressed_path):  # فایل تکراری قبلاً فشرده شده
+        tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False)
+        gz = gzip.GzipFile(fileobj=tmp, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0)
+    try:
+        with open(path, "rb") as f:
+            head = chunk = f.read(READ_CHUNK_BYTES)
+            while chunk:
+                md5.update(chunk)
+                blake2b.update(chunk)
+                crc32 = zlib.crc32(chunk, crc32)
+                lines += chunk.count(b"\n")
+                if text:
+                    try:
+                        decoder.decode(chunk)
+                    except UnicodeDecodeError:
+                        text = False
+                if gz is not None:
+                    gz.write(chunk)
+                chunk = f.read(READ_CHUNK_BYTES)
+        if gz is not None:
+            gz.close()
+            tmp.close()
+            os.replace(tmp.name, compressed_path)
+    except BaseException:
+        if gz is not None:
+            tmp.close()
+            os.unlink(tmp.name)
+        raise
+    size = os.path.getsize(path)
+    compressed_size = os.path.getsize(compressed_path)
+    return {
+        "md5": md5.hexdigest(),
+        "blake2b": blake2b.hexdigest(),
+        "crc32": f"{crc32:08x}",
+        "detected_type": _sniff(head, text),
+        "lines": lines if text else None,
+        "compressed_size": compressed_size,
+        "compression_ratio": round(compressed_size / size, 4) if size else None,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def _sniff(head: bytes, text: bool) -> str:
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if not head:
+        return "application/x-empty"
+    return "text/plain" if text else "application/octet-stream"
+
+
+# //////////////////// Jobs ////////////////////////
+
+class Job:
+    __slots__ = ("id", "created", "description", "files", "tasks")
+
+    def __init__(self):
+        self.id = secrets.token_urlsafe(16)
+        self.created = time.time()
+        self.description = None
+        self.files = []
+        self.tasks = []
+
+    @property
+    def status(self) -> str:
+        if any(entry["status"] in ("queued", "processing") for entry in self.files):
+            return "processing"
+        if any(entry["status"] == "failed" for entry in self.files):
+            return "failed"
+        return "done"
+
+    def to_dict(self) -> dict:
+        return {"job_id": self.id, "status": self.status, "description": self.description, "files": self.files}
+
+
+# //////////////////// Processing Pool ////////////////////////
+
+# کارهای CPU‌بر آپلودها در ProcessPoolExecutor اجرا می‌شوند تا event loop آزاد بماند و همه‌ی هسته‌ها
+# کار کنند. حداکثر max_in_flight فایل هم‌زمان به پردازه‌ها سپرده می‌شود و بقیه در صف می‌مانند؛
+# اگر صف از max_queue بیشتر شود فایل جدید رد می‌شود (مثل HashingPool در hashing.py).
+class ProcessingPool:
+    def __init__(self, max_workers: int | None = None, max_in_flight: int | None = None,
+                 max_queue: int = 1024, max_jobs: int = 10_000):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.max_workers * 2
+        self.max_queue = max_queue
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._executor = None  # پردازه‌ها با اولین فایل ساخته می‌شوند، نه هنگام import
+        self._slots = None  # asyncio.Semaphore به event loop اولین استفاده بسته می‌شود
+        self._slots_loop = None
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def create_job(self) -> Job:
+        job = Job()
+        self.jobs[job.id] = job
+        if len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+        return job
+
+    def get_job(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def discard_job(self, job: Job):
+        self.jobs.pop(job.id, None)
+
+    def submit(self, job: Job, upload: dict, path):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ProcessingPoolBusy()
+        entry = {**upload, "status": "queued"}
+        job.files.append(entry)
+        self.queued += 1
+        job.tasks.append(asyncio.create_task(self._run(entry, str(path))))
+
+    async def wait(self, job: Job):
+        await asyncio.gather(*job.tasks)
+
+    async def _run(self, entry: dict, path: str):
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.max_in_flight), loop
+        async with self._slots:
+            self.queued -= 1
+            self.in_flight += 1
+            entry["status"] = "processing"
+            try:
+                result = await loop.run_in_executor(self._get_executor(), process_file, path)
+            except Exception as exc:
+                self.failed += 1
+                entry.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+            else:
+                self.completed += 1
+                entry.update(result, status="done")
+            finally:
+                self.in_flight -= 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: پردازه‌ی جدید بدون کپی thread‌ها و قفل‌های event loop والد
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "jobs": len(self.jobs),
+        }
@@ -0,0 +1,200 @@
+# گزارش مسیرهای تکراری/سایه‌خورده‌ی ماژول‌ها:
+#   python radix_router.py main part2 part3 part4 part5
+import re
+import sys
+import warnings
+
+from starlette.convertors import PathConvertor
+from starlette.routing import Match, Route, WebSocketRoute
+
+_PARAM = re.compile(r"{([a-zA-Z_][a-zA-Z0-9_]*)}")
+
+
+class RouteConflict(UserWarning):
+    pass
+
+
+# //////////////////// Radix Tree ////////////////////////
+
+class _Node:
+    __slots__ = ("static", "params", "wildcards", "routes")
+
+    def __init__(self):
+        self.static: dict[str, _Node] = {}  # بخش ثابت مسیر -> گره
+        self.params: dict[str, tuple[re.Pattern, _Node]] = {}  # regex پارامتر -> گره
+        self.wildcards: list[int] = []  # مسیرهایی که با {x:path} بقیه‌ی آدرس را می‌گیرند
+        self.routes: list[int] = []  # مسیرهایی که دقیقاً در این گره تمام می‌شوند
+
+
+# هر بخش مسیر به یکی از این‌ها تبدیل می‌شود:
+#   ("static", "items") / ("param", regex) / ("path", ".*")
+def _segments(route) -> list[tuple[str, str]] | None:
+    segments = []
+    parts = route.path_format.split("/")[1:]
+    for position, part in enumerate(parts):
+        names = _PARAM.findall(part)
+        if not names:
+            segments.append(("static", part))
+            continue
+        convertors = [route.param_convertors[name] for name in names]
+        if any(isinstance(convertor, PathConvertor) for convertor in convertors):
+            if part != "{%s}" % names[0] or position != len(parts) - 1:
+                return None  # الگوی نامعمول؛ این مسیر همیشه به روش عادی بررسی می‌شود
+            segments.append(("path", PathConvertor.regex))
+            continue
+        regex = ""
+        last = 0
+        for match, convertor in zip(_PARAM.finditer(part), convertors):
+            regex += re.escape(part[last:match.start()]) + f"(?:{convertor.regex})"
+            last = match.end()
+        regex += re.escape(part[last:])
+        segments.append(("param", regex))
+    return segments
+
+
+# درخت یک بار از روی app.router.routes ساخته می‌شود. جستجو در درخت فقط مسیرهای نامزد را
+# (به ترتیب ثبت) برمی‌گرداند و انتخاب نهایی همچنان با route.matches انجام می‌شود،
+# پس رفتار دقیقاً مثل Starlette است، فقط بدون بررسی یکی‌یکی همه‌ی مسیرها.
+class CompiledRouter:
+    def __init__(self, routes):
+        self.routes = list(routes)
+        self.root = _Node()
+        self.always: list[int] = []  # Mount و مسیرهای دیگری که در درخت نمی‌آیند
+        shapes = []
+        for index, route in enumerate(self.routes):
+            segments = _segments(route) if isinstance(route, (Route, WebSocketRoute)) else None
+            if segments is None:
+                self.always.append(index)
+                continue
+            self._insert(index, segments)
+            shapes.append((index, route, _methods(route), segments))
+        self.conflicts = _find_conflicts(shapes)
+
+    def _insert(self, index: int, segments):
+        node = self.root
+        for kind, value in segments:
+            if kind == "path":
+                node.wildcards.append(index)
+                return
+            if kind == "static":
+                node = node.static.setdefault(value, _Node())
+            else:
+                if value not in node.params:
+                    node.params[value] = (re.compile(value), _Node())
+                node = node.params[value][1]
+        node.routes.append(index)
+
+    def candidates(self, path: str) -> list[int]:
+        parts = path.split("/")[1:]
+        found = list(self.always)
+        stack = [(self.root, 0)]
+        while stack:
+            node, position = stack.pop()
+            found.extend(node.wildcards)
+            if position == len(parts):
+                found.extend(node.routes)
+                continue
+            part = parts[position]
+            child = node.static.get(part)
+            if child is not None:
+                stack.append((child, position + 1))
+            for regex, child in node.params.values():
+                if regex.fullmatch(part):
+                    stack.append((child, position + 1))
+        found.sort()
+        return found
+
+
+def _methods(route) -> set[str]:
+    return set(getattr(route, "methods", None) or {"WEBSOCKET"})
+
+
+# //////////////////// Conflicts ////////////////////////
+
+_BROADER = {
+    "[^/]+": {"[0-9]+", r"[0-9]+(\.[0-9]+)?", "[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"},
+    r"[0-9]+(\.[0-9]+)?": {"[0-9]+"},
+}
+
+
+def _segment_covers(earlier, later) -> bool:
+    if earlier == later:
+        return True
+    kind, value = earlier
+    if kind != "param":
+        return False
+    if later[0] == "static":
+        return re.fullmatch(value, later[1]) is not None
+    if later[0] == "param":
+        return value == "[^/]+" or later[1] in _BROADER.get(value, ())
+    return False
+
+
+# مسیر دوم وقتی سایه خورده است که هر آدرسی که به آن می‌رسد، قبلاً با مسیر اول (با متد مشترک) گرفته شود
+def _covers(earlier, later) -> bool:
+    if earlier and earlier[-1][0] == "path":
+        prefix = earlier[:-1]
+        return len(later) > len(prefix) and all(map(_segment_covers, prefix, later))
+    return len(earlier) == len(later) and all(map(_segment_covers, earlier, later))
+
+
+def _find_conflicts(shapes) -> list[str]:
+    conflicts = []
+    for position, (_, route, methods, segments) in enumerate(shapes):
+        for _, earlier_route, earlier_methods, earlier_segments in shapes[:position]:
+            common = methods & earlier_methods
+            if common and _covers(earlier_segments, segments):
+                kind = "duplicate of" if earlier_segments == segments else "shadowed by"
+                conflicts.append(f"{'/'.join(sorted(common))} {route.path} is {kind} {earlier_route.path} (registered earlier)")
+                break
+    return conflicts
+
+
+# //////////////////// Install ////////////////////////
+
+def install(app) -> CompiledRouter:
+    router = app.router
+    if router.middleware_stack != router.app:
+        raise RuntimeError("compiled router needs the default router middleware stack")
+    compiled = CompiledRouter(router.routes)
+    for conflict in compiled.conflicts:
+        warnings.warn(conflict, RouteConflict, stacklevel=2)
+    fallback = router.middleware_stack
+
+    async def dispatch(scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            root_path = scope.get("root_path", "")
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            for index in compiled.candidates(path):
+                route = compiled.routes[index]
+                match, child_scope = route.matches(scope)
+                if match == Match.FULL:
+                    scope.setdefault("router", router)
+                    scope.update(child_scope)
+                    await route.handle(scope, receive, send)
+                    return
+        # 405، ریدایرکت اسلش و 404 همان مسیر عادی Starlette را می‌روند
+        await fallback(scope, receive, send)
+
+    router.middleware_stack = dispatch
+    return compiled
+
+
+if __name__ == "__main__":
+    import importlib.util
+    from pathlib import Path
+
+    root = Path(__file__).resolve().parent
+    if str(root) in sys.path:
+        sys.path.remove(str(root))
+    sys.path.append(str(root))
+    for name in sys.argv[1:] or ["main", "part2", "part3", "part4", "part5", "jwt"]:
+        spec = importlib.util.spec_from_file_location(f"app_{name}", root / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        compiled = CompiledRouter(module.app.router.routes)
+        print(f"# {name}.py: {len(compiled.routes)} routes, {len(compiled.conflicts)} conflicts")
+        for conflict in compiled.conflicts:
+            print(f"  {conflict}")
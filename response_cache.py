@@ -0,0 +1,187 @@
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.routing import Match
+
+
+# //////////////////// Route Policy ////////////////////////
+
+# زیر دکوراتور مسیر قرار می‌گیرد و فقط سیاست کش را روی تابع می‌نشاند:
+#   @app.get("/models/{model_name}")
+#   @cached(ttl=60, vary=("accept-language",))
+#   async def get_model(...): ...
+def cached(ttl: float, vary: tuple[str, ...] = ()):
+    def decorator(endpoint):
+        endpoint.__response_cache__ = CachePolicy(ttl, vary)
+        return endpoint
+    return decorator
+
+
+class CachePolicy:
+    __slots__ = ("ttl", "vary")
+
+    def __init__(self, ttl: float, vary=()):
+        self.ttl = ttl
+        self.vary = tuple(header.lower() for header in vary)
+
+
+# //////////////////// Response Cache ////////////////////////
+
+# LRU محدود به حجم کل بدنه‌ها. هر ورودی پاسخ کامل و از پیش encode شده است:
+# (expires_at, status, headers, body)
+class ResponseCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, ttl: float, status: int, headers: list, body: bytes):
+        if len(body) > self.max_entry_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.time() + ttl, status, headers, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[3])
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# //////////////////// Middleware ////////////////////////
+
+# فقط GET/HEAD مسیرهایی که @cached دارند کش می‌شوند. کلید: متد، مسیر، query مرتب‌شده و مقدار
+# هدرهای Vary اعلام‌شده. پاسخ‌های غیر 200، دارای Set-Cookie یا Cache-Control: no-store/private
+# ذخیره نمی‌شوند.
+class ResponseCacheMiddleware:
+    def __init__(self, app, cache: ResponseCache, router):
+        self.app = app
+        self.cache = cache
+        self.router = router
+        self._routes = None  # اولین درخواست: [(route, policy یا None)] به ترتیب router
+
+    # مسیرها به ترتیب router بررسی می‌شوند، مثل خود router: فقط اگر اولین تطابق کامل مسیر @cached باشد
+    # کش می‌شود؛ وگرنه پاسخ مسیر دیگری که زودتر ثبت شده با TTL و کلید این مسیر ذخیره می‌شد
+    def _policy(self, scope) -> CachePolicy | None:
+        if self._routes is None:
+            self._routes = [
+                (route, getattr(getattr(route, "endpoint", None), "__response_cache__", None))
+                for route in self.router.routes
+            ]
+            if not any(policy for _, policy in self._routes):
+                self._routes = []  # هیچ مسیری @cached ندارد
+        scope = {**scope, "method": "GET"}
+        for route, policy in self._routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return policy
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        policy = self._policy(scope)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = self._key(scope, policy)
+        entry = self.cache.get(key)
+        if entry is not None:
+            _, status, headers, body = entry
+            await send({"type": "http.response.start", "status": status, "headers": headers + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+            return
+
+        captured = {"start": None, "chunks": [], "size": 0, "cacheable": scope["method"] == "GET"}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if policy.vary:
+                    headers = _merge_vary(headers, policy.vary)
+                captured["start"] = {**message, "headers": headers}
+                captured["cacheable"] &= message["status"] == 200 and _storable(headers)
+                message = {**message, "headers": headers + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body" and captured["cacheable"]:
+                body = message.get("body", b"")
+                captured["size"] += len(body)
+                if captured["size"] > self.cache.max_entry_bytes:
+                    captured["cacheable"] = False
+                    captured["chunks"] = []
+                else:
+                    captured["chunks"].append(body)
+                    if not message.get("more_body", False):
+                        start = captured["start"]
+                        self.cache.put(key, policy.ttl, start["status"], start["headers"], b"".join(captured["chunks"]))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _key(scope, policy: CachePolicy):
+        query = scope.get("query_string", b"").decode("latin-1")
+        normalized = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+        vary = ()
+        if policy.vary:
+            headers = {}
+            for name, value in scope["headers"]:
+                name = name.decode("latin-1")
+                if name in policy.vary:
+                    headers[name] = headers.get(name, "") + value.decode("latin-1")
+            vary = tuple(headers.get(name, "") for name in policy.vary)
+        # HEAD و GET یک ورودی مشترک دارند (بدنه‌ی HEAD هنگام ارسال حذف می‌شود)
+        return scope.get("root_path", ""), scope["path"], normalized, vary
+
+
+def _storable(headers) -> bool:
+    for name, value in headers:
+        name = name.lower()
+        if name == b"set-cookie":
+            return False
+        if name == b"cache-control" and (b"no-store" in value or b"private" in value):
+            return False
+    return True
+
+
+# هدر Vary خود پاسخ (مثلاً Accept از ListStreamer) با Vary سیاست کش در یک هدر ادغام می‌شود
+def _merge_vary(headers: list, vary: tuple[str, ...]) -> list:
+    names = []
+    for name, value in headers:
+        if name.lower() == b"vary":
+            names.extend(part.strip() for part in value.decode("latin-1").split(",") if part.strip())
+    lowered = {name.lower() for name in names}
+    names.extend(name for name in vary if name not in lowered)
+    headers = [(name, value) for name, value in headers if name.lower() != b"vary"]
+    headers.append((b"vary", ", ".join(names).encode("latin-1")))
+    return headers
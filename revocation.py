@@ -0,0 +1,115 @@
+import hashlib
+import math
+import threading
+import time
+
+from jsonfile import locked, read_json, write_json
+
+
+# //////////////////// Bloom Filter ////////////////////////
+
+# پاسخ «نه» قطعی است و پاسخ «شاید» باید با مجموعه‌ی دقیق تایید شود
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+# //////////////////// Revocation List ////////////////////////
+
+# توکن‌های باطل‌شده با jti نگه داشته می‌شوند و فقط تا زمان exp خودشان؛
+# بعد از آن توکن خودش منقضی است و ورودی آن هنگام pruning حذف می‌شود.
+# باطل‌شده‌های جدید تا snapshot بعدی (که jwt.py هر چند ثانیه صدا می‌زند) در _unsaved می‌مانند؛ snapshot
+# آن‌ها را با فایل مشترک همه‌ی workerها ادغام می‌کند (jsonfile.py) و در thread جدا اجرا می‌شود.
+class RevocationList:
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001, prune_interval: float = 60):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.prune_interval = prune_interval
+        self._revoked: dict[str, float] = {}  # jti -> exp
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._next_prune = time.time() + prune_interval
+        self._unsaved: dict[str, float] = {}
+        self._unsaved_lock = threading.Lock()
+
+    def revoke(self, jti: str, exp: float):
+        now = time.time()
+        if exp <= now:
+            return
+        self._revoked[jti] = exp
+        self._bloom.add(jti)
+        with self._unsaved_lock:
+            self._unsaved[jti] = exp
+        if now >= self._next_prune or len(self._revoked) > self._bloom.capacity:
+            self.prune(now)
+
+    def is_revoked(self, jti: str) -> bool:
+        if not self._revoked or jti not in self._bloom:
+            return False
+        return jti in self._revoked
+
+    # حذف ورودی‌های منقضی و ساخت دوباره‌ی فیلتر (از Bloom filter نمی‌شود چیزی حذف کرد)
+    def prune(self, now: float | None = None):
+        now = time.time() if now is None else now
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._bloom = BloomFilter(max(self.capacity, 2 * len(self._revoked)), self.error_rate)
+        for jti in self._revoked:
+            self._bloom.add(jti)
+        self._next_prune = now + self.prune_interval
+
+    def __len__(self):
+        return len(self._revoked)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._unsaved)
+
+    # فایل زیر قفل دوباره خوانده و باطل‌شده‌های ذخیره‌نشده‌ی این پردازه به آن اضافه می‌شوند؛ خروجی همه‌ی
+    # باطل‌شده‌های زنده‌ی فایل (از همه‌ی workerها) است که با merge به این لیست هم اضافه می‌شود
+    def snapshot(self, path) -> dict[str, float]:
+        with self._unsaved_lock:
+            pending, self._unsaved = self._unsaved, {}
+        try:
+            with locked(path):
+                now = time.time()
+                revoked = {jti: exp for jti, exp in (read_json(path) or {}).items() if exp > now}
+                revoked.update((jti, exp) for jti, exp in pending.items() if exp > now)
+                write_json(path, revoked)
+        except BaseException:
+            with self._unsaved_lock:
+                self._unsaved = {**pending, **self._unsaved}  # بار بعد دوباره تلاش می‌شود
+            raise
+        return revoked
+
+    def merge(self, revoked: dict[str, float]):
+        now = time.time()
+        for jti, exp in revoked.items():
+            if exp > now and jti not in self._revoked:
+                self._revoked[jti] = exp
+                self._bloom.add(jti)
+        if len(self._revoked) > self._bloom.capacity:
+            self.prune(now)
+
+    def restore(self, path):
+        self.merge(read_json(path) or {})
+        self.prune()
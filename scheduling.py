@@ -0,0 +1,79 @@
+# pip install numpy
+import warnings
+
+import numpy as np
+
+_SECOND = np.timedelta64(1, "s")
+_DAY = np.timedelta64(1, "D")
+# همان بازه‌ی datetime پایتون؛ بیرون از آن (یا NaT) خروجی NaN یا رشته‌ی نامعتبر می‌شد
+_MIN = np.datetime64("0001-01-01T00:00:00", "us")
+_MAX = np.datetime64("9999-12-31T23:59:59.999999", "us")
+_MAX_SECONDS = float((_MAX - _MIN) / _SECOND)
+
+
+# //////////////////// Batch Windows ////////////////////////
+
+# همان محاسبه‌ی /items6/ برای هزاران پنجره در یک مرحله:
+#   start_process = start + process_after
+#   duration      = end - start_process
+#   next_repeat   = اولین زمان بعد از start_process که ساعتش برابر repeat_at است
+# زمان‌ها UTC در نظر گرفته می‌شوند؛ زمانی که offset دارد به UTC تبدیل می‌شود.
+def compute_windows(start, end, process_after, repeat_at=None) -> dict:
+    start = parse_datetimes(start)
+    end = parse_datetimes(end)
+    seconds = np.asarray(process_after, dtype=np.float64)
+    if not len(start) == len(end) == len(seconds):
+        raise ValueError("start, end and process_after must have the same length")
+    _reject(start_datetime=_out_of_range(start), end_datetime=_out_of_range(end),
+            process_after=~(np.abs(seconds) <= _MAX_SECONDS))  # NaN و inf هم رد می‌شوند
+
+    start_process = start + parse_seconds(seconds)
+    _reject(process_after=_out_of_range(start_process))
+    result = {
+        "start_process": format_datetimes(start_process),
+        "duration": ((end - start_process) / _SECOND).tolist(),
+    }
+    if repeat_at is not None:
+        if len(repeat_at) != len(start):
+            raise ValueError("repeat_at must have the same length as start")
+        at = parse_times(repeat_at)
+        next_repeat = start_process.astype("datetime64[D]") + at
+        next_repeat = np.where(next_repeat < start_process, next_repeat + _DAY, next_repeat)
+        result["next_repeat"] = format_datetimes(next_repeat)
+    return result
+
+
+def _out_of_range(values: np.ndarray) -> np.ndarray:
+    return np.isnat(values) | (values < _MIN) | (values > _MAX)
+
+
+def _reject(**invalid):
+    bad = {name: np.flatnonzero(mask).tolist() for name, mask in invalid.items() if mask.any()}
+    if bad:
+        raise ValueError("missing or out-of-range values: " + ", ".join(
+            f"{name} at indices {indices}" for name, indices in bad.items()))
+
+
+def parse_datetimes(values) -> np.ndarray:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", "no explicit representation of timezones", UserWarning)
+        return np.array(values, dtype="datetime64[us]")
+
+
+def parse_seconds(values) -> np.ndarray:
+    return np.rint(np.asarray(values, dtype=np.float64) * 1e6).astype(np.int64).astype("timedelta64[us]")
+
+
+# "HH:MM[:SS[.ffffff]]" -> فاصله از نیمه‌شب؛ None -> NaT
+def parse_times(values) -> np.ndarray:
+    stamps = np.array([None if value is None else f"1970-01-01T{value}" for value in values], dtype="datetime64[us]")
+    return stamps - np.datetime64(0, "us")
+
+
+def format_datetimes(values: np.ndarray) -> list:
+    # مثل isoformat پایتون: میکروثانیه فقط وقتی لازم است نوشته می‌شود
+    microseconds = values.astype(np.int64) % 1_000_000
+    unit = "us" if microseconds[~np.isnat(values)].any() else "s"
+    strings = np.datetime_as_string(values, unit=unit).astype(object)
+    strings[np.isnat(values)] = None
+    return strings.tolist()
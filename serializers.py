@@ -0,0 +1,323 @@
+import contextvars
+import functools
+import inspect
+import itertools
+import os
+from types import UnionType
+from typing import Union, get_args, get_origin
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic.functional_serializers import PlainSerializer, WrapSerializer
+from pydantic_core import to_json
+
+# با PRECOMPILED_SERIALIZERS=0 همه‌ی مسیرها از مسیر عمومی FastAPI استفاده می‌کنند
+ENABLED = os.environ.get("PRECOMPILED_SERIALIZERS", "1") == "1"
+STREAM_BATCH_SIZE = 1000  # عناصری که با هم اعتبارسنجی و به یک تکه‌ی پاسخ تبدیل می‌شوند
+
+_accept = contextvars.ContextVar("accept", default="")  # هدر Accept درخواست جاری، برای انتخاب NDJSON
+
+
+# //////////////////// Precompiled Serializers ////////////////////////
+
+# برای هر مسیری که response_model دارد، هنگام شروع یک TypeAdapter ساخته می‌شود و خروجی
+# handler مستقیم با dump_json به بایت تبدیل می‌شود (بدون jsonable_encoder و json.dumps).
+# مسیرهای بدون response_model همان مسیر عمومی FastAPI را می‌روند.
+class PrecompiledRoute(APIRoute):
+    def get_route_handler(self):
+        streamer = None
+        # handlerهای yield‌دار را خود FastAPI به صورت JSONL/SSE می‌فرستد
+        native_stream = getattr(self, "is_json_stream", False) or getattr(self, "is_sse_stream", False)
+        if ENABLED and not native_stream and not getattr(self, "_precompiled", False):
+            serializer = build_serializer(self)
+            if serializer is not None:
+                streamer = build_streamer(self)
+                self.dependant.call = _wrap_endpoint(self.dependant.call, serializer, streamer)
+            self._precompiled = True
+        handler = super().get_route_handler()
+        if streamer is None:
+            return handler
+
+        async def app(request):
+            token = _accept.set(request.headers.get("accept", ""))
+            try:
+                return await handler(request)
+            finally:
+                _accept.reset(token)
+
+        return app
+
+
+def build_serializer(route: APIRoute):
+    if route.response_model is None:
+        return None
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    # پاسخی که handler با پارامتر Response هدر یا کوکی‌اش را تغییر می‌دهد، باید مسیر عادی را برود
+    if response_class is not JSONResponse or _uses_response_param(route.dependant):
+        return None
+    adapter = TypeAdapter(route.response_model)
+    options = _dump_options(route)
+    status_code = route.status_code or 200
+
+    def serialize(result):
+        if isinstance(result, Response):
+            return result
+        try:
+            value = adapter.validate_python(result, from_attributes=True)
+        except ValidationError as exc:
+            raise ResponseValidationError(exc.errors(include_url=False), body=result)
+        return Response(adapter.dump_json(value, **options), status_code=status_code, media_type="application/json")
+
+    if getattr(route.endpoint, "__trusted_return__", False):
+        fields = _output_fields(route)
+        if fields is not None:
+            return _trusted_serializer(fields, serialize, status_code)
+    return serialize
+
+
+# //////////////////// Trusted Returns ////////////////////////
+
+_REQUIRED = object()
+
+
+# handler قول می‌دهد خروجی‌اش از قبل معتبر است؛ به جای اعتبارسنجی دوباره فقط فیلدهای response_model
+# (یا include) از آن برداشته می‌شود:
+#   @app.post("/user/", response_model=UserOut)
+#   @trusted_return
+#   async def create_user(user: UserIn): ...
+def trusted_return(endpoint):
+    endpoint.__trusted_return__ = True
+    return endpoint
+
+
+# فیلدهای خروجی (نام، پیش‌فرض) یک بار برای هر مسیر؛ None یعنی این مسیر فقط با اعتبارسنجی درست سریال می‌شود
+def _output_fields(route: APIRoute):
+    model = route.response_model
+    if not (isinstance(model, type) and issubclass(model, BaseModel)):
+        return None
+    if model.model_computed_fields or model.__pydantic_decorators__.field_serializers \
+            or model.__pydantic_decorators__.model_serializers:
+        return None
+    if route.response_model_exclude_unset or route.response_model_exclude_defaults or route.response_model_exclude_none:
+        return None
+    include, exclude = route.response_model_include, route.response_model_exclude
+    if not all(names is None or isinstance(names, (set, frozenset)) for names in (include, exclude)):
+        return None  # include/exclude تودرتو
+    fields = []
+    for name, field in model.model_fields.items():
+        if (include is not None and name not in include) or (exclude is not None and name in exclude):
+            continue
+        if route.response_model_by_alias and (field.serialization_alias or field.alias or name) != name:
+            return None
+        default = _REQUIRED if field.is_required() else field.get_default(call_default_factory=True)
+        fields.append((name, default, field.annotation))
+    return fields
+
+
+# برای هر نوع خروجی (مدل مبدأ یا dict) یک تابع انتخاب فیلد ساخته و نگه داشته می‌شود.
+# خروجی‌ای که با فیلدها جور نیست (مثلاً فیلد اجباری ندارد) همان مسیر اعتبارسنجی را می‌رود.
+def _trusted_serializer(fields, fallback, status_code: int):
+    pickers = {}
+
+    def serialize(result):
+        source = type(result)
+        picker = pickers.get(source)
+        if picker is None:
+            picker = pickers[source] = _compile_picker(source, fields)
+        body = picker(result) if picker else None
+        if body is None:
+            return fallback(result)
+        return Response(body, status_code=status_code, media_type="application/json")
+
+    return serialize
+
+
+# include فقط فیلدهای سطح اول را محدود می‌کند و مقدارهای تودرتو با schema مبدأ سریال می‌شوند؛ پس مدل
+# مبدأ فقط وقتی مستقیم سریال می‌شود که نوع هر فیلد برداشته‌شده دقیقاً همان نوع response_model باشد
+# (وگرنه مثلاً owner: Priv(name, password) به جای owner: Pub(name) با password بیرون می‌رفت).
+# همچنین مدل مبدأ نباید خودش سریال شدن آن فیلدها را عوض کند (exclude، alias، serializer، computed field).
+# از dict فقط مقدارهای ساده‌ای برداشته می‌شود که نوعشان دقیقاً نوع فیلد است؛ بقیه اعتبارسنجی می‌شوند.
+def _compile_picker(source, fields):
+    if issubclass(source, BaseModel):
+        if not _plain_serialization(source, {name for name, _, _ in fields}):
+            return False
+        for name, _, annotation in fields:
+            source_field = source.model_fields.get(name)
+            if source_field is None or source_field.annotation != annotation:
+                return False
+        include = {name for name, _, _ in fields}
+        return lambda result: result.__pydantic_serializer__.to_json(result, include=include)
+    if issubclass(source, dict):
+        allowed = [(name, default, _scalar_types(annotation)) for name, default, annotation in fields]
+        if any(types is None for _, _, types in allowed):
+            return False
+
+        def pick(result):
+            picked = {}
+            for name, default, types in allowed:
+                if name in result:
+                    value = result[name]
+                    if type(value) not in types:
+                        return None
+                    picked[name] = value
+                elif default is _REQUIRED:
+                    return None
+                else:
+                    picked[name] = default
+            return to_json(picked)
+        return pick
+    return False
+
+
+# آیا dump مدل مبدأ برای این فیلدها همان مقدار خام فیلد را می‌نویسد؟ (مثل اعتبارسنجی دوباره با response_model)
+def _plain_serialization(source, names: set) -> bool:
+    decorators = source.__pydantic_decorators__
+    if source.model_computed_fields or decorators.model_serializers:
+        return False
+    for decorator in decorators.field_serializers.values():
+        if "*" in decorator.info.fields or names.intersection(decorator.info.fields):
+            return False
+    for name in names:
+        field = source.model_fields.get(name)
+        if field is None:
+            continue
+        if field.exclude or field.alias or field.serialization_alias:
+            return False
+        if any(isinstance(meta, (PlainSerializer, WrapSerializer)) for meta in field.metadata):
+            return False
+    return True
+
+
+# نوع‌های مجاز یک فیلد ساده (مثلاً float | None -> {float, NoneType})؛ None برای فیلدهای غیر ساده
+def _scalar_types(annotation):
+    if annotation in (str, int, float, bool, type(None)):
+        return {annotation}
+    if get_origin(annotation) in (Union, UnionType):
+        types = set()
+        for arg in get_args(annotation):
+            arg_types = _scalar_types(arg)
+            if arg_types is None:
+                return None
+            types |= arg_types
+        return types
+    return None
+
+
+def _dump_options(route: APIRoute) -> dict:
+    return {
+        "include": route.response_model_include,
+        "exclude": route.response_model_exclude,
+        "by_alias": route.response_model_by_alias,
+        "exclude_unset": route.response_model_exclude_unset,
+        "exclude_defaults": route.response_model_exclude_defaults,
+        "exclude_none": route.response_model_exclude_none,
+    }
+
+
+def _uses_response_param(dependant) -> bool:
+    if dependant.response_param_name is not None:
+        return True
+    return any(_uses_response_param(dependency) for dependency in dependant.dependencies)
+
+
+# //////////////////// Streaming Lists ////////////////////////
+
+# مسیری با response_model=list[X] می‌تواند به جای لیست، یک generator (sync یا async) برگرداند. عناصر در
+# دسته‌های STREAM_BATCH_SIZE تایی اعتبارسنجی و به صورت آرایه‌ی JSON (یا NDJSON اگر Accept آن را بخواهد)
+# فرستاده می‌شوند، پس حافظه به اندازه‌ی دسته بستگی دارد نه کل نتیجه. دسته‌ی اول قبل از شروع پاسخ
+# ساخته می‌شود تا خطای اعتبارسنجی آن هنوز 500 عادی باشد؛ خطا در دسته‌های بعدی پاسخ را قطع می‌کند.
+class ListStreamer:
+    def __init__(self, item_type, options: dict, status_code: int, batch_size: int = STREAM_BATCH_SIZE):
+        self.list_adapter = TypeAdapter(list[item_type])
+        self.item_adapter = TypeAdapter(item_type)
+        self.options = {key: value for key, value in options.items() if key not in ("include", "exclude")}
+        self.status_code = status_code
+        self.batch_size = batch_size
+
+    def encode(self, batch: list, ndjson: bool) -> bytes:
+        try:
+            values = self.list_adapter.validate_python(batch, from_attributes=True)
+        except ValidationError as exc:
+            raise ResponseValidationError(exc.errors(include_url=False), body=batch)
+        if ndjson:
+            return b"".join(self.item_adapter.dump_json(value, **self.options) + b"\n" for value in values)
+        return self.list_adapter.dump_json(values, **self.options)[1:-1]  # بدون [ و ]
+
+    def first_batch(self, result) -> list:
+        return list(itertools.islice(result, self.batch_size))
+
+    async def first_batch_async(self, result) -> list:
+        if not inspect.isasyncgen(result):
+            return await run_in_threadpool(self.first_batch, result)
+        batch = []
+        async for item in result:
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                break
+        return batch
+
+    async def batches(self, result):
+        while True:
+            batch = await self.first_batch_async(result)
+            if not batch:
+                return
+            yield batch
+
+    def response(self, first: list, result) -> StreamingResponse:
+        ndjson = "application/x-ndjson" in _accept.get()
+        head = self.encode(first, ndjson)
+
+        async def body():
+            written = bool(head)
+            yield head if ndjson else b"[" + head
+            if len(first) == self.batch_size:
+                async for batch in self.batches(result):
+                    chunk = self.encode(batch, ndjson)
+                    yield chunk if ndjson or not written else b"," + chunk
+                    written = True
+            if not ndjson:
+                yield b"]"
+
+        media_type = "application/x-ndjson" if ndjson else "application/json"
+        return StreamingResponse(body(), status_code=self.status_code, media_type=media_type, headers={"Vary": "Accept"})
+
+
+def build_streamer(route: APIRoute) -> ListStreamer | None:
+    if get_origin(route.response_model) is not list or route.response_model_include or route.response_model_exclude:
+        return None
+    (item_type,) = get_args(route.response_model) or (None,)
+    if item_type is None:
+        return None
+    return ListStreamer(item_type, _dump_options(route), route.status_code or 200)
+
+
+def _is_stream(result) -> bool:
+    return inspect.isgenerator(result) or inspect.isasyncgen(result)
+
+
+# نوع تابع (sync/async) باید حفظ شود تا FastAPI توابع sync را همچنان در threadpool اجرا کند
+def _wrap_endpoint(call, serialize, streamer=None):
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(**values):
+            result = await call(**values)
+            if streamer is not None and _is_stream(result):
+                return streamer.response(await streamer.first_batch_async(result), result)
+            return serialize(result)
+    else:
+        # این تابع در threadpool اجرا می‌شود، پس دسته‌ی اول generator همین‌جا خوانده می‌شود
+        @functools.wraps(call)
+        def endpoint(**values):
+            result = call(**values)
+            if streamer is not None and inspect.isgenerator(result):
+                return streamer.response(streamer.first_batch(result), result)
+            return serialize(result)
+    return endpoint
@@ -0,0 +1,200 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_UNLOADED = object()  # داده هنوز از backend خوانده نشده است
+
+
+# //////////////////// Session ////////////////////////
+
+# داده‌ی نشست به صورت رشته‌ی JSON نگه داشته می‌شود و فقط وقتی handler به آن دست بزند
+# decode می‌شود. هر تغییر modified را True می‌کند تا save بداند باید بنویسد یا نه.
+class Session:
+    __slots__ = ("id", "expires_at", "modified", "_raw", "_data", "_store", "_persisted_until")
+
+    def __init__(self, store, session_id: str, expires_at: float, raw=None, persisted_until: float = 0.0):
+        self.id = session_id
+        self.expires_at = expires_at
+        self.modified = False
+        self._raw = raw  # str یا None (نشست خالی) یا _UNLOADED
+        self._data = None
+        self._store = store
+        self._persisted_until = persisted_until  # expires_at ذخیره‌شده در backend
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            if self._raw is _UNLOADED:
+                self._raw = self._store._load_raw(self.id)
+            self._data = json.loads(self._raw) if self._raw else {}
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def clear(self):
+        self.data.clear()
+        self.modified = True
+
+
+# //////////////////// Session Store ////////////////////////
+
+# LRU در حافظه با TTL لغزان: هر get مهلت نشست را تمدید می‌کند و آن را به انتهای صف می‌برد،
+# پس ترتیب LRU همان ترتیب انقضاست و prune فقط از ابتدای صف حذف می‌کند.
+# با backend، نشستی که از حافظه بیرون رفته در اولین درخواست بعدی دوباره (بدون داده) بارگذاری می‌شود.
+# نشست‌های منقضی (در حافظه و در backend) هنگام save، حداکثر هر prune_interval ثانیه یک بار حذف می‌شوند.
+class SessionStore:
+    def __init__(self, maxsize: int = 1_000_000, ttl: float = 1800, backend=None, prune_interval: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.prune_interval = prune_interval
+        self._next_prune = time.time() + prune_interval
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    # نشست جدید تا اولین save که در آن تغییری داده شده باشد در store ثبت نمی‌شود
+    def create(self) -> Session:
+        return Session(self, secrets.token_urlsafe(32), time.time() + self.ttl)
+
+    def get(self, session_id: str) -> Session | None:
+        now = time.time()
+        session = self._sessions.get(session_id)
+        if session is None and self.backend is not None:
+            session = self._load(session_id, now)
+        if session is None or session.expires_at <= now:
+            if session is not None:
+                self.delete(session_id)
+            self.misses += 1
+            return None
+        session.expires_at = now + self.ttl
+        self._sessions.move_to_end(session_id)
+        self.hits += 1
+        return session
+
+    def _load(self, session_id: str, now: float) -> Session | None:
+        expires_at = self.backend.expires_at(session_id)
+        if expires_at is None or expires_at <= now:
+            return None
+        session = Session(self, session_id, expires_at, raw=_UNLOADED, persisted_until=expires_at)
+        self._insert(session)
+        return session
+
+    def _load_raw(self, session_id: str) -> str | None:
+        return self.backend.load(session_id) if self.backend is not None else None
+
+    # write-back: فقط نشست تغییرکرده نوشته می‌شود. برای نشست بدون تغییر فقط وقتی نیمی از TTL
+    # ذخیره‌شده گذشته باشد expires_at در backend تمدید می‌شود (نه در هر درخواست).
+    def save(self, session: Session):
+        now = time.time()
+        if now >= self._next_prune:
+            self.prune(now)
+        if session.modified:
+            session._raw = json.dumps(session._data, separators=(",", ":")) if session._data else None
+            session._data = None  # در حافظه فقط شکل فشرده‌ی JSON می‌ماند
+            session.modified = False
+            if session.id not in self._sessions:
+                self._insert(session)
+            if self.backend is not None:
+                self.backend.save(session.id, session._raw, session.expires_at)
+                session._persisted_until = session.expires_at
+                self.writes += 1
+        elif self.backend is not None and session._persisted_until - now < self.ttl / 2:
+            if session.id in self._sessions:
+                self.backend.touch(session.id, session.expires_at)
+                session._persisted_until = session.expires_at
+                self.writes += 1
+
+    def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        if self.backend is not None:
+            self.backend.delete(session_id)
+
+    def _insert(self, session: Session):
+        self._sessions[session.id] = session
+        while len(self._sessions) > self.maxsize:
+            self._sessions.popitem(last=False)
+
+    def prune(self, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        removed = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+            removed += 1
+        if self.backend is not None:
+            self.backend.prune(now)
+        self._next_prune = now + self.prune_interval
+        return removed
+
+    def stats(self):
+        return {"size": len(self._sessions), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "writes": self.writes}
+
+
+# //////////////////// SQLite Backend ////////////////////////
+
+class SQLiteSessionBackend:
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT, expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def expires_at(self, session_id: str) -> float | None:
+        with self._lock:
+            row = self._db.execute("SELECT expires_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_id: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id: str, data: str | None, expires_at: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (session_id, data, expires_at),
+            )
+
+    def touch(self, session_id: str, expires_at: float):
+        with self._lock:
+            self._db.execute("UPDATE sessions SET expires_at = ? WHERE id = ?", (expires_at, session_id))
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def prune(self, now: float):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,75 @@
+import functools
+import inspect
+import os
+import time
+from bisect import bisect_left
+
+
+# //////////////////// Stage Timing ////////////////////////
+
+# زمان‌سنجی مراحل احراز هویت به جای print. فقط با AUTH_STAGE_TIMING=1 فعال می‌شود؛
+# در حالت غیرفعال دکوراتور خود تابع را برمی‌گرداند، پس در production هیچ هزینه‌ای ندارد.
+ENABLED = os.environ.get("AUTH_STAGE_TIMING") == "1"
+
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class StageHistogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # آخرین خانه: بیشتر از بزرگ‌ترین مرز
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "buckets": {
+                f"le_{bound}ms" if i < len(BUCKETS_MS) else "inf": n
+                for i, (bound, n) in enumerate(zip(BUCKETS_MS + (None,), self.buckets))
+            },
+        }
+
+
+histograms: dict[str, StageHistogram] = {}
+
+
+def stage(name: str):
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        histogram = histograms.setdefault(name, StageHistogram())
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    return {name: histogram.to_dict() for name, histogram in histograms.items()}
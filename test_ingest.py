@@ -0,0 +1,181 @@
+# python -m pytest test_ingest.py
+import asyncio
+import json
+
+import pytest
+from pydantic import BaseModel
+
+from ingest import BatchValidator, RecordError, iter_csv, iter_json_array, iter_ndjson
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _collect(parser, data: bytes, size: int) -> list:
+    async def run():
+        return [(number, str(value) if isinstance(value, RecordError) else value)
+                async for number, value in parser(_chunks(data, size))]
+    return asyncio.run(run())
+
+
+# ورودی در هر نقطه‌ی ممکن (و تکه‌های یک‌بایتی) بریده می‌شود؛ نتیجه باید با خواندن یکجا یکی باشد
+def _assert_split_invariant(parser, data: bytes, expected: list):
+    assert _collect(parser, data, len(data) or 1) == expected
+    assert _collect(parser, data, 1) == expected
+    for split in range(1, len(data)):
+        async def two_parts():
+            yield data[:split]
+            yield data[split:]
+
+        async def run():
+            return [(number, str(value) if isinstance(value, RecordError) else value)
+                    async for number, value in parser(two_parts())]
+        assert asyncio.run(run()) == expected, f"split at byte {split}"
+
+
+# //////////////////// NDJSON ////////////////////////
+
+def test_ndjson_split_anywhere():
+    data = '{"name": "Foo", "price": 1.5}\n\n{"name": "گل", "price": 2}\r\n[1, 2]\n{"name": "tail"}'.encode()
+    _assert_split_invariant(iter_ndjson, data, [
+        (1, {"name": "Foo", "price": 1.5}),
+        (3, {"name": "گل", "price": 2}),
+        (4, [1, 2]),
+        (5, {"name": "tail"}),
+    ])
+
+
+def test_ndjson_invalid_line_is_reported_and_parsing_continues():
+    records = _collect(iter_ndjson, b'{"a": 1}\n{bad\n{"a": 2}\n', 4)
+    assert records[0] == (1, {"a": 1})
+    assert records[1][0] == 2 and records[1][1].startswith("invalid JSON")
+    assert records[2] == (3, {"a": 2})
+
+
+def test_ndjson_overlong_line(monkeypatch):
+    monkeypatch.setattr("ingest.MAX_RECORD_BYTES", 16)
+    with pytest.raises(RecordError, match="line 2 is longer than 16 bytes"):
+        _collect(iter_ndjson, b'{"a": 1}\n' + b'{"a": "' + b"x" * 40 + b'"}\n', 8)
+
+
+# //////////////////// JSON array ////////////////////////
+
+def test_json_array_split_anywhere():
+    data = ' [ {"s": "a],\\"b[", "n": [1, {"x": null}]} , 12.5e3,-7, "گل" ,true, [] ] '.encode()
+    _assert_split_invariant(iter_json_array, data, [
+        (1, {"s": 'a],"b[', "n": [1, {"x": None}]}),
+        (2, 12.5e3),
+        (3, -7),
+        (4, "گل"),
+        (5, True),
+        (6, []),
+    ])
+
+
+def test_json_array_empty():
+    _assert_split_invariant(iter_json_array, b"[ ]", [])
+
+
+@pytest.mark.parametrize("data, message", [
+    (b'{"a": 1}', "body is not a JSON array"),
+    (b"[1 2]", "expected ',' or ']' after element 1"),
+    (b"[1, 2] 3", "unexpected data after the JSON array"),
+    (b"[1, 2", "incomplete JSON array"),
+    (b"[1, {bad}]", "element 2 is not valid JSON"),
+    (b"[1, ", "incomplete JSON array"),
+])
+def test_json_array_errors(data, message):
+    for size in (1, 3, len(data)):
+        with pytest.raises(RecordError, match=message):
+            _collect(iter_json_array, data, size)
+
+
+def test_json_array_overlong_element(monkeypatch):
+    monkeypatch.setattr("ingest.MAX_RECORD_BYTES", 16)
+    with pytest.raises(RecordError, match="element 2 is not valid JSON"):
+        _collect(iter_json_array, b'[1, "' + b"x" * 40, 4)
+
+
+# //////////////////// CSV ////////////////////////
+
+def test_csv_split_anywhere():
+    data = ('\ufeffusername, email ,full_name\r\n'
+            'ali,ali@example.com,"Ali ""The"" Rezaei"\r\n'
+            '\r\n'
+            'sara,sara@example.com,"line one\nline two, with comma"\n'
+            'reza,,\n'
+            'مینا,mina@example.com,مینا').encode()
+    _assert_split_invariant(iter_csv, data, [
+        (2, {"username": "ali", "email": "ali@example.com", "full_name": 'Ali "The" Rezaei'}),
+        (4, {"username": "sara", "email": "sara@example.com", "full_name": "line one\nline two, with comma"}),
+        (6, {"username": "reza"}),
+        (7, {"username": "مینا", "email": "mina@example.com", "full_name": "مینا"}),
+    ])
+
+
+def test_csv_wrong_column_count_is_reported_and_parsing_continues():
+    records = _collect(iter_csv, b"a,b\n1,2\n1\n1,2,3\n3,4\n", 5)
+    assert records == [
+        (2, {"a": "1", "b": "2"}),
+        (3, "expected 2 columns, got 1"),
+        (4, "expected 2 columns, got 3"),
+        (5, {"a": "3", "b": "4"}),
+    ]
+
+
+def test_csv_unterminated_quote():
+    with pytest.raises(RecordError, match="unterminated quoted field starting on line 3"):
+        _collect(iter_csv, b'a,b\n1,2\n3,"open\nstill open\n', 4)
+
+
+def test_csv_overlong_row(monkeypatch):
+    monkeypatch.setattr("ingest.MAX_RECORD_BYTES", 16)
+    with pytest.raises(RecordError, match="row starting on line 2"):
+        _collect(iter_csv, b'a\n"' + b"x\n" * 20, 4)
+
+
+# //////////////////// Batch Validation ////////////////////////
+
+class _Item(BaseModel):
+    name: str
+    price: float
+
+
+def test_batch_validator_keeps_line_numbers_across_batches():
+    data = b"\n".join(json.dumps(record).encode() for record in [
+        {"name": "a", "price": 1},
+        {"name": "b"},
+        {"name": "c", "price": 3},
+        {"name": "d", "price": "x"},
+        {"name": "e", "price": 5},
+    ]) + b"\nnot json\n"
+    validator = BatchValidator(_Item, batch_size=2)
+
+    async def run():
+        return [batch async for batch in validator.numbered_batches(iter_ndjson(_chunks(data, 7)))]
+
+    batches = asyncio.run(run())
+    numbers = [number for batch_numbers, _, _ in batches for number in batch_numbers]
+    names = [item.name for _, items, _ in batches for item in items]
+    errors = [error["line"] for _, _, batch_errors in batches for error in batch_errors]
+    assert numbers == [1, 3, 5]
+    assert names == ["a", "c", "e"]
+    assert errors == [2, 4, 6]
+    assert len(batches) == 3  # خطای JSON آخر در همان دسته‌ی آخر گزارش می‌شود
+
+
+def test_bulk_endpoint_stores_accepted_items():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    before = len(main.catalog)
+    body = b'{"name": "Bulk1", "price": 1}\n{"name": "bad", "price": -1}\n{"name": "Bulk2", "price": 2}\n'
+    response = TestClient(main.app).post("/items/bulk", content=body)
+    assert response.json() == {"accepted": 2, "rejected": 1, "errors": [
+        {"line": 2, "errors": ["price: Input should be greater than 0"]}]}
+    assert len(main.catalog) == before + 2
+    names = [item["name"] for item in main.catalog.query("created_at", 0, 100)]
+    assert names[-2:] == ["Bulk1", "Bulk2"]
@@ -0,0 +1,47 @@
+# python -m pytest test_response_cache.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from response_cache import ResponseCache, ResponseCacheMiddleware, cached
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, cache=ResponseCache(), router=app.router)
+    calls = []
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        calls.append(item_id)
+        return {"item_id": item_id, "calls": len(calls)}
+
+    # همان الگوی مسیر، ولی بعد از مسیر بالا ثبت شده و router هرگز به آن نمی‌رسد
+    @app.get("/items/{name}")
+    @cached(ttl=60)
+    async def read_item_by_name(name: str):
+        return {"name": name}
+
+    @app.get("/models/{name}")
+    @cached(ttl=60)
+    async def read_model(name: str):
+        calls.append(name)
+        return {"name": name, "calls": len(calls)}
+
+    return TestClient(app)
+
+
+# پاسخ مسیر بدون @cached که زودتر ثبت شده و همان مسیر را می‌گیرد نباید با policy مسیر بعدی کش شود
+def test_earlier_uncached_route_is_not_cached():
+    client = _app()
+    first = client.get("/items/1")
+    second = client.get("/items/1")
+    assert "x-cache" not in first.headers and "x-cache" not in second.headers
+    assert second.json() == {"item_id": 1, "calls": 2}
+
+
+def test_cached_route_hits():
+    client = _app()
+    assert client.get("/models/a").headers["x-cache"] == "MISS"
+    response = client.get("/models/a")
+    assert response.headers["x-cache"] == "HIT"
+    assert response.json() == {"name": "a", "calls": 1}
@@ -0,0 +1,85 @@
+# python -m pytest test_serializers.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, Field, computed_field, field_serializer, model_serializer
+
+from serializers import PrecompiledRoute, trusted_return
+
+
+class Out(BaseModel):
+    username: str
+    email: str
+
+
+class ExcludedEmail(BaseModel):
+    username: str
+    email: str = Field(exclude=True)
+    password: str
+
+
+class SerializedEmail(BaseModel):
+    username: str
+    email: str
+    password: str
+
+    @field_serializer("email")
+    def show_email(self, email: str) -> str:
+        return f"{email}|{self.password}"
+
+
+class AliasedEmail(BaseModel):
+    username: str
+    email: str = Field(serialization_alias="mail")
+    password: str
+
+
+class WholeModelSerializer(BaseModel):
+    username: str
+    email: str
+    password: str
+
+    @model_serializer
+    def dump(self):
+        return {"username": self.username, "email": self.email, "password": self.password}
+
+
+class WithComputed(BaseModel):
+    username: str
+    email: str
+    password: str
+
+    @computed_field
+    @property
+    def secret(self) -> str:
+        return self.password
+
+
+class Plain(BaseModel):
+    username: str
+    email: str
+    password: str
+
+
+def _client(source) -> TestClient:
+    app = FastAPI()
+    app.router.route_class = PrecompiledRoute
+
+    @app.get("/user", response_model=Out)
+    @trusted_return
+    async def read_user():
+        return source(username="u", email="e@x", password="pw")
+
+    return TestClient(app)
+
+
+# مدل مبدأی که خودش سریال شدن فیلدها را عوض می‌کند باید همان خروجی مسیر عادی FastAPI را بدهد
+def test_source_serialization_changes_fall_back_to_validation():
+    for source in (ExcludedEmail, SerializedEmail, AliasedEmail, WholeModelSerializer, WithComputed):
+        response = _client(source).get("/user")
+        assert response.status_code == 200, source.__name__
+        assert response.json() == {"username": "u", "email": "e@x"}, source.__name__
+
+
+def test_plain_source_uses_fast_path():
+    response = _client(Plain).get("/user")
+    assert response.json() == {"username": "u", "email": "e@x"}
@@ -0,0 +1,73 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+# //////////////////// Token Cache ////////////////////////
+
+# کش LRU توکن‌های تاییدشده: کلید، هش توکن است (خود توکن نگه داشته نمی‌شود)
+# و هر ورودی حداکثر تا زمان exp همان توکن معتبر می‌ماند.
+class TokenCache:
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (expires_at, username, value)
+        self._by_user = {}  # username -> set[digest]
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, token: str, username: str, value, exp: float | None = None):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        key = self._key(token)
+        self._remove(key)
+        self._entries[key] = (expires_at, username, value)
+        self._by_user.setdefault(username, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_token(self, token: str):
+        self._remove(self._key(token))
+
+    # مثلاً وقتی کاربر غیرفعال می‌شود، همه‌ی توکن‌های کش‌شده‌ی او باید دور ریخته شوند
+    def invalidate_user(self, username: str):
+        for key in self._by_user.pop(username, ()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _remove(self, key: bytes):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[1]]
+
+    def stats(self):
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,228 @@
+import contextvars
+import inspect
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from fastapi.routing import APIRoute
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+
+
+# //////////////////// Spans ////////////////////////
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "sampled", "tracestate",
+                 "start_ns", "end_ns", "attributes", "_trace")
+
+    def __init__(self, name, trace_id, parent_id, sampled, tracestate=None, trace=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.tracestate = tracestate
+        # در درخواست نمونه‌برداری‌نشده هیچ شناسه، زمان یا لیستی ساخته نمی‌شود
+        self.span_id = os.urandom(8).hex() if sampled else None
+        self.start_ns = time.time_ns() if sampled else 0
+        self.end_ns = 0
+        self.attributes = {}
+        self._trace = trace if trace is not None else []  # همه‌ی spanهای یک درخواست، برای export یکجا
+
+    def child(self, name: str) -> "Span":
+        return Span(name, self.trace_id, self.span_id, True, self.tracestate, self._trace)
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        self._trace.append(self)
+
+    def to_dict(self) -> dict:
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+                "start_ns": self.start_ns, "end_ns": self.end_ns, "attributes": self.attributes}
+
+
+def parse_traceparent(value: str | None):
+    match = _TRACEPARENT.match(value.strip().lower()) if value else None
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, int(flags, 16) & 1 == 1
+
+
+# هدرهایی که باید روی درخواست‌های خروجی به سرویس‌های دیگر گذاشته شوند
+def outgoing_headers() -> dict:
+    span = _current.get()
+    if span is None:
+        return {}
+    if span.trace_id is None:
+        span.trace_id = os.urandom(16).hex()
+    span_id = span.span_id or os.urandom(8).hex()
+    headers = {"traceparent": f"00-{span.trace_id}-{span_id}-{'01' if span.sampled else '00'}"}
+    if span.tracestate:
+        headers["tracestate"] = span.tracestate
+    return headers
+
+
+# //////////////////// Exporters ////////////////////////
+
+# هر exporter فقط یک متد export(spans) دارد
+class InMemoryExporter:
+    def __init__(self, maxlen: int = 10_000):
+        self.spans = deque(maxlen=maxlen)
+
+    def export(self, spans):
+        self.spans.extend(span.to_dict() for span in spans)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class FileExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(json.dumps(span.to_dict()) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+# //////////////////// Tracer ////////////////////////
+
+# نمونه‌برداری head-based: اگر traceparent ورودی داشته باشیم تصمیم والد رعایت می‌شود،
+# وگرنه درخواست با احتمال sample_rate نمونه‌برداری می‌شود.
+class Tracer:
+    def __init__(self, sample_rate: float = 0.01, exporter=None):
+        self.sample_rate = sample_rate
+        self.exporter = exporter if exporter is not None else InMemoryExporter()
+
+    def start(self, name: str, traceparent: str | None, tracestate: str | None) -> Span:
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = None, None, random.random() < self.sample_rate
+            if sampled:
+                trace_id = os.urandom(16).hex()
+        return Span(name, trace_id, parent_id, sampled, tracestate if parent is not None else None)
+
+
+class TracingMiddleware:
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = tracestate = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+            elif name == b"tracestate":
+                tracestate = value.decode("latin-1")
+        span = self.tracer.start(f"{scope['method']} {scope['path']}", traceparent, tracestate)
+        token = _current.set(span)
+        if not span.sampled:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _current.reset(token)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            span.attributes["http.method"] = scope["method"]
+            if route is not None:
+                span.name = f"{scope['method']} {route.path}"
+            span.end()
+            self.tracer.exporter.export(span._trace)
+
+
+# //////////////////// Route Instrumentation ////////////////////////
+
+# handler و هر dependency با یک span جدا اجرا می‌شوند. شیء جایگزین hash و برابری تابع اصلی را دارد
+# تا dependency_overrides و کش dependencyهای FastAPI مثل قبل کار کنند.
+class _TracedCall:
+    def __init__(self, call, name: str):
+        self.__wrapped__ = call
+        self.name = name
+
+    def __hash__(self):
+        return hash(self.__wrapped__)
+
+    def __eq__(self, other):
+        if isinstance(other, _TracedCall):
+            other = other.__wrapped__
+        return self.__wrapped__ == other
+
+
+class _SyncTracedCall(_TracedCall):
+    def __call__(self, *args, **kwargs):
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return self.__wrapped__(*args, **kwargs)
+        span = parent.child(self.name)
+        token = _current.set(span)
+        try:
+            return self.__wrapped__(*args, **kwargs)
+        finally:
+            _current.reset(token)
+            span.end()
+
+
+class _AsyncTracedCall(_TracedCall):
+    async def __call__(self, *args, **kwargs):
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return await self.__wrapped__(*args, **kwargs)
+        span = parent.child(self.name)
+        token = _current.set(span)
+        try:
+            return await self.__wrapped__(*args, **kwargs)
+        finally:
+            _current.reset(token)
+            span.end()
+
+
+def _traced(call, kind: str):
+    # dependencyهای yield‌دار (generator) دست نخورده می‌مانند
+    if isinstance(call, _TracedCall) or inspect.isgeneratorfunction(call) or inspect.isasyncgenfunction(call):
+        return call
+    name = f"{kind} {getattr(call, '__qualname__', type(call).__qualname__)}"
+    is_async = inspect.iscoroutinefunction(call) or (
+        not inspect.isclass(call) and inspect.iscoroutinefunction(getattr(call, "__call__", None))
+    )
+    return (_AsyncTracedCall if is_async else _SyncTracedCall)(call, name)
+
+
+def _instrument(dependant):
+    for sub_dependant in dependant.dependencies:
+        if sub_dependant.call is not None:
+            sub_dependant.call = _traced(sub_dependant.call, "dependency")
+        _instrument(sub_dependant)
+
+
+class TracedRoute(APIRoute):
+    def get_route_handler(self):
+        if not getattr(self, "_traced", False):
+            _instrument(self.dependant)
+            self.dependant.call = _traced(self.dependant.call, "handler")
+            self._traced = True
+        return super().get_route_handler()
@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.responses import FileResponse
+
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 1024 * 1024 * 1024))
+WRITE_BUFFER_BYTES = 1024 * 1024  # حداکثر داده‌ای که از هر آپلود در حافظه می‌ماند
+MAX_FIELD_BYTES = 64 * 1024  # فیلدهای متنی فرم کنار فایل
+MAX_FIELDS = 64  # حداکثر بخش متنی در یک فرم؛ همراه MAX_FIELD_BYTES حافظه‌ی فیلدها را محدود می‌کند
+MAX_FIELDS_BYTES = 1024 * 1024  # مجموع همه‌ی فیلدهای متنی
+MAX_FILES = 32  # حداکثر فایل در یک فرم چندفایلی
+DOWNLOAD_CHUNK_BYTES = int(os.environ.get("DOWNLOAD_CHUNK_BYTES", 1024 * 1024))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadError(Exception):
+    pass
+
+
+# //////////////////// Blob Store ////////////////////////
+
+# فایل‌ها با SHA-256 محتوایشان ذخیره می‌شوند: root/ab/cd/abcd...؛ فایل تکراری فقط یک بار روی دیسک می‌ماند
+class BlobStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.tmp = self.root / "tmp"
+        self.tmp.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def stat(self, sha256: str) -> os.stat_result | None:
+        try:
+            return os.stat(self.path_for(sha256))
+        except FileNotFoundError:
+            return None
+
+    def writer(self, max_bytes: int = MAX_UPLOAD_BYTES) -> "BlobWriter":
+        return BlobWriter(self, max_bytes)
+
+
+# FileResponse خودش Range/If-Range (206 و multipart/byteranges) را پشتیبانی می‌کند و اگر سرور افزونه‌ی
+# http.response.pathsend را داشته باشد فایل را zero-copy می‌فرستد؛ در غیر این صورت تکه‌های ثابت
+# chunk_size را در thread می‌خواند، پس حافظه‌ی هر دانلود ثابت است. تکه‌ی بزرگ‌تر از 64KB پیش‌فرض
+# رفت‌وبرگشت‌های thread را برای فایل‌های چند گیگابایتی کم می‌کند.
+class BlobResponse(FileResponse):
+    chunk_size = DOWNLOAD_CHUNK_BYTES
+
+
+# داده در بافر کوچکی جمع و در thread جدا هش و روی دیسک نوشته می‌شود. تا نوشتن تمام نشده
+# تکه‌ی بعدی از درخواست خوانده نمی‌شود، پس کلاینت سریع‌تر از دیسک نمی‌تواند بفرستد (backpressure).
+class BlobWriter:
+    def __init__(self, store: BlobStore, max_bytes: int):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = []
+        self._buffered = 0
+        self._file = None
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"upload is larger than {self.max_bytes} bytes")
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= WRITE_BUFFER_BYTES:
+            await self._flush()
+
+    async def _flush(self):
+        data = b"".join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(dir=self.store.tmp, delete=False)
+        self._hash.update(data)  # hashlib برای داده‌ی بزرگ GIL را آزاد می‌کند
+        self._file.write(data)
+
+    async def commit(self) -> dict:
+        await self._flush()
+        sha256 = self._hash.hexdigest()
+        duplicate = await asyncio.to_thread(self._finish, sha256)
+        return {"sha256": sha256, "size": self.size, "duplicate": duplicate}
+
+    def _finish(self, sha256: str) -> bool:
+        self._file.close()
+        path = self.store.path_for(sha256)
+        if path.exists():
+            os.unlink(self._file.name)
+            return True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._file.name, path)
+        return False
+
+    async def abort(self):
+        self._buffer = []
+        if self._file is not None:
+            await asyncio.to_thread(self._discard)
+
+    def _discard(self):
+        self._file.close()
+        try:
+            os.unlink(self._file.name)
+        except FileNotFoundError:
+            pass
+
+
+# //////////////////// Streaming Multipart ////////////////////////
+
+# بدنه‌ی multipart تکه‌تکه به parser داده می‌شود و داده‌ی فیلد فایل مستقیم به BlobWriter می‌رود؛
+# برخلاف UploadFile هیچ کپی کامل فایل (در حافظه یا SpooledTemporaryFile) ساخته نمی‌شود.
+async def receive_file(request, store: BlobStore, field: str = "file", max_bytes: int = MAX_UPLOAD_BYTES) -> dict:
+    files, fields = await _receive(request, store, field, max_bytes, max_files=1, on_file=None)
+    return {**files[0], "fields": fields}
+
+
+# مثل receive_file اما برای چند فایل با یک نام فیلد؛ on_file(upload) همان لحظه‌ای صدا زده می‌شود که
+# هر فایل کامل ذخیره شد، پس پردازش آن می‌تواند هم‌زمان با دریافت فایل‌های بعدی شروع شود.
+async def receive_files(request, store: BlobStore, field: str = "files", max_bytes: int = MAX_UPLOAD_BYTES,
+                        max_files: int = MAX_FILES, on_file=None) -> tuple[list[dict], dict]:
+    return await _receive(request, store, field, max_bytes, max_files, on_file)
+
+
+async def _receive(request, store: BlobStore, field: str, max_bytes: int, max_files: int, on_file):
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes * max_files:
+        raise UploadTooLarge(f"upload is larger than {max_bytes * max_files} bytes")
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("expected a multipart/form-data body")
+
+    form = _FormState(field, max_files)
+    parser = MultipartParser(params[b"boundary"], form.callbacks())
+    files = []
+    writer = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event in form.events:
+                if event[0] == "data":
+                    await writer.write(event[1])
+                elif event[0] == "begin":
+                    writer = store.writer(max_bytes)
+                else:
+                    result = await writer.commit()
+                    writer = None
+                    files.append({"filename": event[1], "content_type": event[2], **result})
+                    if on_file is not None:
+                        on_file(files[-1])
+            form.events.clear()
+        parser.finalize()
+        if writer is not None:
+            raise UploadError("multipart body ended inside a file")
+        if not files:
+            raise UploadError(f"form has no file field {field!r}")
+    except BaseException:
+        if writer is not None:
+            await writer.abort()
+        raise
+    return files, form.fields
+
+
+class _FormState:
+    def __init__(self, field: str, max_files: int = 1):
+        self.field = field
+        self.max_files = max_files
+        self.file_count = 0
+        self.field_count = 0
+        self.field_bytes = 0
+        self.fields = {}
+        # ("begin",) و ("data", bytes) و ("end", filename, content_type) از آخرین تکه‌ی ورودی
+        self.events = []
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._target = None  # "file" یا نام فیلد متنی
+        self._filename = None
+        self._content_type = None
+        self._value = bytearray()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._value = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+        self._check_header()
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+        self._check_header()
+
+    def _check_header(self):
+        if len(self._header_name) + len(self._header_value) > MAX_FIELD_BYTES:
+            raise UploadError(f"part header is larger than {MAX_FIELD_BYTES} bytes")
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" not in options:
+            if self.field_count == MAX_FIELDS:
+                raise UploadTooLarge(f"form has more than {MAX_FIELDS} fields")
+            self.field_count += 1
+            self._target = name
+            return
+        if name != self.field:
+            raise UploadError(f"unexpected file field {name!r}")
+        if self.file_count == self.max_files:
+            raise UploadError(f"form has more than {self.max_files} files")
+        self.file_count += 1
+        self._target = "file"
+        self._filename = options[b"filename"].decode("utf-8", "replace")
+        self._content_type = self._headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+        self.events.append(("begin",))
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._target == "file":
+            self.events.append(("data", data[start:end]))
+            return
+        self._value += data[start:end]
+        if len(self._value) > MAX_FIELD_BYTES:
+            raise UploadError(f"form field {self._target!r} is larger than {MAX_FIELD_BYTES} bytes")
+        self.field_bytes += end - start
+        if self.field_bytes > MAX_FIELDS_BYTES:
+            raise UploadTooLarge(f"form fields are larger than {MAX_FIELDS_BYTES} bytes in total")
+
+    def on_part_end(self):
+        if self._target == "file":
+            self.events.append(("end", self._filename, self._content_type))
+        else:
+            self.fields[self._target] = self._value.decode("utf-8", "replace")
+        self._target = None
@@ -0,0 +1,164 @@
+# وارد کردن انبوه کاربران از CSV یا NDJSON به فایل کاربران (مثل user_store.py، خارج از سرور اجرا شود):
+#   python user_import.py new_users.csv users.json --workers 8 --errors errors.ndjson
+# فیلدها: username, password, email و اختیاری full_name, disabled
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pydantic import BaseModel, EmailStr, Field
+
+from ingest import BatchValidator, RecordError, iter_csv, iter_ndjson
+from user_store import UserStore, normalize_username
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+# همان فیلدهای UserIn1 در part3.py، به اضافه‌ی disabled
+class ImportedUser(BaseModel):
+    username: str = Field(min_length=1)
+    password: str = Field(min_length=1)
+    email: EmailStr
+    full_name: str | None = None
+    disabled: bool = False
+
+
+# //////////////////// Hashing ////////////////////////
+
+# در پردازه‌های جدا اجرا می‌شود. rounds از پردازه‌ی اصلی (hashing.BCRYPT_ROUNDS) می‌آید تا هر
+# پردازه دوباره calibrate نکند؛ None یعنی پیش‌فرض passlib، همان pwd_context در hashing.py
+def hash_passwords(passwords: list[str], rounds: int | None) -> list[str]:
+    from passlib.hash import bcrypt
+
+    hasher = bcrypt.using(rounds=rounds) if rounds else bcrypt
+    return [hasher.hash(password) for password in passwords]
+
+
+# //////////////////// Importer ////////////////////////
+
+# رکوردها به صورت جریانی خوانده و در دسته‌های batch_size تایی اعتبارسنجی می‌شوند (ingest.py). رمزهای هر
+# دسته در تکه‌های hash_chunk تایی بین پردازه‌ها پخش می‌شوند و تا وقتی دسته‌های قبلی هش می‌شوند، دسته‌های
+# بعدی خوانده و اعتبارسنجی می‌شوند. حداکثر max_in_flight تکه هم‌زمان در صف پردازه‌هاست. هر دسته یکجا
+# (همه یا هیچ) به مخزن اضافه می‌شود و فایل کاربران هر save_every دسته یک بار (و در پایان) نوشته می‌شود؛
+# بازنویسی کل فایل JSON بعد از هر دسته زمان import را درجه‌ی دو می‌کرد.
+class UserImporter:
+    def __init__(self, store: UserStore, workers: int | None = None, rounds: int | None = None,
+                 batch_size: int = 1000, hash_chunk: int = 16, save_every: int = 20):
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.rounds = rounds
+        self.batch_size = batch_size
+        self.hash_chunk = hash_chunk
+        self.save_every = save_every
+        self.max_in_flight = self.workers * 2
+        self.imported = 0
+        self.rejected = 0
+
+    async def run(self, records, report=None) -> dict:
+        report = report or (lambda error: None)
+        try:
+            await self._run(records, report)
+        finally:
+            self.store.save()  # دسته‌هایی که تا خطای ورودی (RecordError) اضافه شده‌اند هم ذخیره می‌شوند
+        return {"imported": self.imported, "rejected": self.rejected}
+
+    async def _run(self, records, report):
+        validator = BatchValidator(ImportedUser, self.batch_size)
+        loop = asyncio.get_running_loop()
+        seen = set()  # نام‌های این فایل که هنوز به مخزن اضافه نشده‌اند
+        pending = deque()  # (rows, futures) به ترتیب فایل
+        # هر تکه پیش از سپرده شدن به پردازه‌ها یک جا می‌گیرد و با تمام شدنش آزاد می‌کند؛ وقتی جا نیست
+        # خواندن ورودی هم صبر می‌کند، پس بیش از max_in_flight تکه هرگز در صف پردازه‌ها نیست
+        slots = asyncio.Semaphore(self.max_in_flight)
+        batches = 0
+        with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            async for numbers, users, errors in validator.numbered_batches(records):
+                rows = []
+                for number, user in zip(numbers, users):
+                    key = normalize_username(user.username)
+                    # تکراری‌ها قبل از bcrypt کنار گذاشته می‌شوند تا وقت پردازه‌ها هدر نرود
+                    if key in seen or user.username in self.store:
+                        errors.append({"line": number, "errors": [f"username: {user.username!r} already exists"]})
+                        continue
+                    seen.add(key)
+                    rows.append((number, user))
+                self._report(sorted(errors, key=lambda error: error["line"]), report)
+                futures = []
+                for i in range(0, len(rows), self.hash_chunk):
+                    await slots.acquire()
+                    future = loop.run_in_executor(executor, hash_passwords,
+                                                  [user.password for _, user in rows[i:i + self.hash_chunk]], self.rounds)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append(future)
+                pending.append((rows, futures))
+                # دسته‌های تمام‌شده‌ی ابتدای صف بدون صبر کردن اضافه می‌شوند؛ بقیه در حال هش شدن می‌مانند
+                while pending and all(future.done() for future in pending[0][1]):
+                    await self._commit(pending.popleft(), seen, report)
+                    batches += 1
+                    if batches % self.save_every == 0:
+                        self.store.save()
+            while pending:
+                await self._commit(pending.popleft(), seen, report)
+
+    async def _commit(self, batch, seen: set, report):
+        rows, futures = batch
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        users = []
+        errors = []
+        for i, result in enumerate(results):
+            chunk = rows[i * self.hash_chunk:(i + 1) * self.hash_chunk]
+            if isinstance(result, BaseException):
+                errors.extend({"line": number, "errors": [f"password: hashing failed: {result}"]} for number, _ in chunk)
+                continue
+            for (_, user), hashed_password in zip(chunk, result):
+                users.append({"username": user.username, "email": str(user.email), "full_name": user.full_name,
+                              "hashed_password": hashed_password, "disabled": user.disabled})
+        self.store.add_many(users)
+        self.imported += len(users)
+        for _, user in rows:
+            seen.discard(normalize_username(user.username))
+        self._report(errors, report)
+
+    def _report(self, errors: list[dict], report):
+        self.rejected += len(errors)
+        for error in errors:
+            report(error)
+
+
+async def read_chunks(f):
+    while chunk := f.read(READ_CHUNK_BYTES):
+        yield chunk
+
+
+if __name__ == "__main__":
+    from hashing import BCRYPT_ROUNDS
+
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV or NDJSON into a users file")
+    parser.add_argument("source", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("users_file", help="users JSON file (created if missing)")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="default: from the source file extension")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--errors", help="write per-row errors as NDJSON to this file (default: stderr)")
+    args = parser.parse_args()
+
+    source_format = args.format or ("csv" if args.source.lower().endswith(".csv") else "ndjson")
+    source = sys.stdin.buffer if args.source == "-" else open(args.source, "rb")
+    errors_file = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+    parse = iter_csv if source_format == "csv" else iter_ndjson
+    importer = UserImporter(UserStore(args.users_file), workers=args.workers, rounds=BCRYPT_ROUNDS,
+                            batch_size=args.batch_size)
+    try:
+        summary = asyncio.run(importer.run(
+            parse(read_chunks(source)), lambda error: errors_file.write(json.dumps(error, ensure_ascii=False) + "\n")))
+    except RecordError as exc:
+        sys.exit(f"{args.source}: {exc} ({importer.imported} users imported before the error)")
+    finally:
+        source.close()
+        if errors_file is not sys.stderr:
+            errors_file.close()
+    print(f"{summary['imported']} users imported into {args.users_file}, {summary['rejected']} rows rejected")
@@ -0,0 +1,179 @@
+# ساخت فایل کاربران با رمزهای هش‌شده (یک بار، خارج از سرور):
+#   python user_store.py users.seed.json users.json
+# فایل seed لیستی از کاربران با فیلد password (متن ساده) است.
+import json
+import sys
+import threading
+from pathlib import Path
+
+from jsonfile import locked, read_json, write_json
+
+
+# //////////////////// User Repository ////////////////////////
+
+# هر کاربر یک شیء کوچک با __slots__ است (بدون dict و بدون مدل pydantic)؛
+# مدل pydantic فقط در مرز پاسخ و با to_model ساخته می‌شود.
+class UserRecord:
+    __slots__ = ("username", "email", "full_name", "hashed_password", "disabled")
+
+    def __init__(self, username: str, hashed_password: str, email: str | None = None,
+                 full_name: str | None = None, disabled: bool | None = False):
+        self.username = username
+        self.email = email
+        self.full_name = full_name
+        self.hashed_password = hashed_password
+        self.disabled = disabled
+
+    def to_model(self, model):
+        return model.model_validate(self, from_attributes=True)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def normalize_username(username: str) -> str:
+    return username.strip().casefold()
+
+
+# ایندکس اصلی روی نام کاربری نرمال‌شده و ایندکس دوم روی ایمیل؛ هر دو جستجو O(1) است
+class UserRepository:
+    def __init__(self, users=()):
+        self._by_username: dict[str, UserRecord] = {}
+        self._by_email: dict[str, UserRecord] = {}
+        for user in users:
+            self.add(user)
+
+    def add(self, user: dict) -> UserRecord:
+        record = UserRecord(**user)
+        key = normalize_username(record.username)
+        if key in self._by_username:
+            raise ValueError(f"duplicate username: {record.username}")
+        self._by_username[key] = record
+        if record.email:
+            self._by_email[record.email.casefold()] = record
+        return record
+
+    # همه یا هیچ: اگر یکی از نام‌ها تکراری باشد هیچ کاربری از این دسته اضافه نمی‌شود
+    def add_many(self, users: list[dict]) -> list[UserRecord]:
+        seen = set()
+        duplicates = []
+        for user in users:
+            key = normalize_username(user["username"])
+            if key in seen or key in self._by_username:
+                duplicates.append(user["username"])
+            seen.add(key)
+        if duplicates:
+            raise ValueError(f"duplicate usernames: {', '.join(duplicates)}")
+        return [self.add(user) for user in users]
+
+    def get(self, username: str) -> UserRecord | None:
+        return self._by_username.get(normalize_username(username))
+
+    def get_by_email(self, email: str) -> UserRecord | None:
+        return self._by_email.get(email.casefold())
+
+    def __contains__(self, username: str):
+        return normalize_username(username) in self._by_username
+
+    def __iter__(self):
+        return iter(self._by_username.values())
+
+    def __len__(self):
+        return len(self._by_username)
+
+
+# //////////////////// User Store ////////////////////////
+
+# کاربران با رمز از قبل هش‌شده از فایل خوانده می‌شوند، آن هم فقط در اولین استفاده؛
+# بنابراین import و reload سرور هیچ هزینه‌ی bcrypt ندارد.
+# چند پردازه (سرور و user_import.py) ممکن است هم‌زمان در یک فایل بنویسند، پس save کل حافظه را
+# روی فایل نمی‌نویسد: زیر قفل فایل، نسخه‌ی روی دیسک دوباره خوانده و فقط کاربرانی که این پردازه
+# اضافه یا عوض کرده روی آن اعمال می‌شوند (jsonfile.py). تغییرها تا save بعدی در _changed جمع می‌شوند؛
+# سرور save را دوره‌ای صدا می‌زند (jwt.py)، نه برای هر هش دوباره در login.
+class UserStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._repository = None
+        self._changed: dict[str, UserRecord] = {}  # نام نرمال‌شده -> رکوردی که هنوز ذخیره نشده
+        self._changed_lock = threading.Lock()  # update_hashed_password از threadهای مختلف صدا زده می‌شود
+
+    @property
+    def repository(self) -> UserRepository:
+        if self._repository is None:
+            self._repository = UserRepository(read_json(self.path, []))
+        return self._repository
+
+    def get(self, username: str) -> UserRecord | None:
+        return self.repository.get(username)
+
+    def get_by_email(self, email: str) -> UserRecord | None:
+        return self.repository.get_by_email(email)
+
+    def __contains__(self, username: str):
+        return username in self.repository
+
+    def __iter__(self):
+        return iter(self.repository)
+
+    def __len__(self):
+        return len(self.repository)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._changed)
+
+    def add_many(self, users: list[dict]) -> list[UserRecord]:
+        records = self.repository.add_many(users)
+        with self._changed_lock:
+            for record in records:
+                self._changed[normalize_username(record.username)] = record
+        return records
+
+    # فقط در حافظه؛ با save بعدی نوشته می‌شود
+    def update_hashed_password(self, username: str, hashed_password: str):
+        record = self.get(username)
+        record.hashed_password = hashed_password
+        with self._changed_lock:
+            self._changed[normalize_username(username)] = record
+
+    # نوشتن در فایل موقت یکتا و جایگزینی، تا فایل کاربران هیچ‌وقت نیمه‌کاره نماند. کاربرانی که
+    # پردازه‌های دیگر در این فاصله اضافه کرده‌اند حفظ می‌شوند و به مخزن این پردازه هم اضافه می‌شوند.
+    def save(self):
+        with self._changed_lock:
+            changed, self._changed = self._changed, {}
+        try:
+            with locked(self.path):
+                users = {normalize_username(user["username"]): user for user in read_json(self.path, [])}
+                for key, record in changed.items():
+                    users[key] = record.to_dict()
+                write_json(self.path, list(users.values()), indent=4, ensure_ascii=False)
+        except BaseException:
+            with self._changed_lock:
+                self._changed = {**changed, **self._changed}  # بار بعد دوباره تلاش می‌شود
+            raise
+        repository = self.repository
+        for key, user in users.items():
+            if repository.get(key) is None:
+                repository.add(user)
+
+
+def hash_seed_users(seed_users: list[dict]) -> list[dict]:
+    from hashing import pwd_context
+
+    users = []
+    for seed in seed_users:
+        user = {key: value for key, value in seed.items() if key != "password"}
+        user["hashed_password"] = pwd_context.hash(seed["password"])
+        user.setdefault("disabled", False)
+        users.append(user)
+    return users
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python user_store.py SEED_JSON OUTPUT_JSON")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        users = hash_seed_users(json.load(f))
+    with open(sys.argv[2], "w", encoding="utf-8") as f:
+        json.dump(users, f, indent=4, ensure_ascii=False)
+    print(f"{len(users)} users written to {sys.argv[2]}")